@@ -1,9 +1,15 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from datetime import timedelta
 import math
 from services.database import mongo
+from services.players import new_player, validate_player, update_pipeline, parse_bulk_updates, stored_stats
+from services.utils import encode_cursor, decode_cursor, keyset_filter
+from services import catalog, json_codec, leaderboard, player_store, ratelimit, summary
+from services.performances import ingest_performances
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -16,6 +22,87 @@ def admin_login():
         return jsonify(access_token=access_token), 200
     return jsonify({"msg": "Invalid admin credentials"}), 401
 
+# Player Listing
+LISTING_SORT_FIELDS = ['value', 'Category']
+LISTING_BATCH_SIZE = 500
+
+def _listing_query(args):
+    """Build (filter, projection, sort, limit) from the player listing query params.
+
+    ``fields`` is a comma-separated projection, ``sort`` one of the indexed
+    LISTING_SORT_FIELDS (prefix with "-" for descending), ``category`` an
+    optional Category filter, ``limit`` the page size and ``cursor`` the
+    X-Next-Cursor of the previous page.
+    """
+    sort_by = args.get('sort')
+    direction = -1 if sort_by and sort_by.startswith('-') else 1
+    field = sort_by.lstrip('-') if sort_by else None
+    if field is not None and field not in LISTING_SORT_FIELDS:
+        raise ValueError(f"Sort must be one of {', '.join(LISTING_SORT_FIELDS)}")
+
+    projection = None
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        if any(f.startswith('$') for f in fields):
+            raise ValueError("Invalid field name")
+        projection = {f: 1 for f in fields + ([field] if field else [])}
+
+    limit = args.get('limit', type=int)
+    if limit is not None and limit < 1:
+        raise ValueError("Limit must be positive")
+
+    query = {}
+    if args.get('cursor'):
+        after = decode_cursor(args['cursor'])
+        if not isinstance(after[-1], ObjectId) or len(after) != (2 if field else 1) or \
+                isinstance(after[0], (dict, list)):
+            raise ValueError("Invalid cursor")
+        query = keyset_filter(field, direction, after)
+    if args.get('category'):
+        query['Category'] = args['category']
+
+    sort = ([(field, direction)] if field else []) + [('_id', direction)]
+    return query, projection, sort, limit
+
+def _stream_players(query, projection, sort, limit):
+    """Stream matching players as a JSON array, or as NDJSON if requested.
+
+    Paged requests read one extra document to know whether another page
+    follows and return its cursor in the X-Next-Cursor header.
+    """
+    cursor = mongo.db.players.find(query, projection).sort(sort).batch_size(LISTING_BATCH_SIZE)
+    headers = {}
+    if limit is not None:
+        page = list(cursor.limit(limit + 1))
+        if len(page) > limit:
+            page = page[:limit]
+            last = page[-1]
+            headers['X-Next-Cursor'] = encode_cursor(*[last.get(key) for key, _ in sort])
+        cursor = page
+
+    ndjson = request.args.get('format') == 'ndjson' or \
+        request.accept_mimetypes.best == 'application/x-ndjson'
+
+    def generate():
+        if not ndjson:
+            yield '['
+        for i, player in enumerate(cursor):
+            line = json_codec.dumps(player)
+            if ndjson:
+                yield line + '\n'
+            else:
+                yield (',' if i else '') + line
+        if not ndjson:
+            yield ']'
+
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers=headers)
+
+def _players_changed():
+    """Drop in-process caches derived from players after an admin write"""
+    catalog.invalidate()
+    player_store.reload_unless_watched()
+
 # Player CRUD Operations
 @admin_bp.route('/players', methods=['GET', 'POST'])
 @jwt_required()
@@ -24,21 +111,53 @@ def manage_players():
         return jsonify({"msg": "Admin access required"}), 403
     
     if request.method == 'GET':
-        players = list(mongo.db.players.find())
-        return jsonify([{**player, '_id': str(player['_id'])} for player in players])
+        try:
+            query = _listing_query(request.args)
+        except ValueError as e:
+            return jsonify({"msg": str(e)}), 400
+        return _stream_players(*query)
     
     if request.method == 'POST':
-        data = request.get_json()
-        required_fields = ['Name', 'University', 'Category', 'Total_Runs', 
-                         'Balls_Faced', 'Innings_Played', 'Wickets', 
-                         'Overs_Bowled', 'Runs_Conceded']
+        try:
+            player = new_player(request.get_json())
+        except ValueError as e:
+            return jsonify({"msg": str(e)}), 400
         
-        if not all(field in data for field in required_fields):
-            return jsonify({"msg": "Missing required fields"}), 400
-        
-        result = mongo.db.players.insert_one(data)
+        try:
+            result = mongo.db.players.insert_one(player)
+        except DuplicateKeyError:
+            return jsonify({"msg": "A player with this name already exists"}), 409
+        _players_changed()
         return jsonify({'_id': str(result.inserted_id)}), 201
 
+@admin_bp.route('/players', methods=['PATCH'])
+@jwt_required()
+def bulk_update_players():
+    if get_jwt_identity() != 'admin':
+        return jsonify({"msg": "Admin access required"}), 403
+    
+    try:
+        updates = parse_bulk_updates((request.get_json() or {}).get('updates'))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    
+    # One unordered batch; every update recomputes its derived stats in place
+    try:
+        result = mongo.db.players.bulk_write([
+            UpdateOne({'_id': player_id}, update_pipeline(fields)) for player_id, fields in updates
+        ], ordered=False).bulk_api_result
+        errors = []
+    except BulkWriteError as e:
+        result = e.details
+        errors = [{"_id": str(updates[error['index']][0]), "msg": error['errmsg']} for error in e.details['writeErrors']]
+    _players_changed()
+    
+    return jsonify({
+        "matched": result['nMatched'],
+        "modified": result['nModified'],
+        "errors": errors
+    }), 200 if not errors else 207
+
 @admin_bp.route('/players/<string:player_id>', methods=['PUT', 'DELETE'])
 @jwt_required()
 def single_player_operations(player_id):
@@ -46,21 +165,47 @@ def single_player_operations(player_id):
         return jsonify({"msg": "Admin access required"}), 403
     
     if request.method == 'PUT':
-        data = request.get_json()
-        result = mongo.db.players.update_one(
-            {'_id': ObjectId(player_id)},
-            {'$set': data}
-        )
-        if result.modified_count:
+        try:
+            fields = validate_player(request.get_json(), partial=True)
+        except ValueError as e:
+            return jsonify({"msg": str(e)}), 400
+        
+        try:
+            result = mongo.db.players.update_one({'_id': ObjectId(player_id)}, update_pipeline(fields))
+        except DuplicateKeyError:
+            return jsonify({"msg": "A player with this name already exists"}), 409
+        _players_changed()
+        if result.matched_count:
             return jsonify({"msg": "Player updated successfully"}), 200
         return jsonify({"msg": "Player not found"}), 404
     
     if request.method == 'DELETE':
         result = mongo.db.players.delete_one({'_id': ObjectId(player_id)})
+        _players_changed()
         if result.deleted_count:
             return jsonify({"msg": "Player deleted successfully"}), 200
         return jsonify({"msg": "Player not found"}), 404
 
+# Match Performances
+@admin_bp.route('/performances', methods=['POST'])
+@jwt_required()
+def ingest_match_performances():
+    if get_jwt_identity() != 'admin':
+        return jsonify({"msg": "Admin access required"}), 403
+    if not current_app.config.get('PERFORMANCES_ENABLED', True):
+        return jsonify({"msg": "Match performance ingest is unavailable"}), 503
+    
+    data = request.get_json() or {}
+    try:
+        stats = ingest_performances(data.get('match_id'), data.get('rows'))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    
+    _players_changed()
+    if stats['users_updated']:
+        leaderboard.invalidate()
+    return jsonify(stats), 200
+
 # Player Statistics
 @admin_bp.route('/players/<string:player_id>/stats')
 @jwt_required()
@@ -68,31 +213,19 @@ def player_stats(player_id):
     if get_jwt_identity() != 'admin':
         return jsonify({"msg": "Admin access required"}), 403
     
-    player = mongo.db.players.find_one({'_id': ObjectId(player_id)})
+    player = player_store.get_store().get(ObjectId(player_id))
     if not player:
         return jsonify({"msg": "Player not found"}), 404
 
-    # Batting calculations
-    batting_sr = (player['Total_Runs'] / player['Balls_Faced']) * 100 if player['Balls_Faced'] else 0
-    batting_avg = player['Total_Runs'] / player['Innings_Played'] if player['Innings_Played'] else 0
-    
-    # Bowling calculations
-    balls_bowled = player['Overs_Bowled'] * 6 if player['Overs_Bowled'] else 0
-    bowling_sr = balls_bowled / player['Wickets'] if player['Wickets'] else 0
-    economy = (player['Runs_Conceded'] / balls_bowled) * 6 if balls_bowled else 0
-    
-    # Points and value calculations
-    points = ((batting_sr / 5) + (batting_avg * 0.8)) + \
-            ((500 / batting_sr if batting_sr else 0) + (140 / economy if economy else 0))
-    value = round(((9 * points + 100) * 1000) / 50000) * 50000
+    stats = stored_stats(player)
 
     return jsonify({
-        'batting_strike_rate': round(batting_sr, 2),
-        'batting_average': round(batting_avg, 2),
-        'bowling_strike_rate': round(bowling_sr, 2),
-        'economy': round(economy, 2),
-        'points': round(points, 2),
-        'value': value,
+        'batting_strike_rate': stats['batting_sr'],
+        'batting_average': stats['batting_avg'],
+        'bowling_strike_rate': stats['bowling_sr'],
+        'economy': stats['economy'],
+        'points': stats['points'],
+        'value': stats['value'],
         'player_details': {
             'Name': player['Name'],
             'University': player['University'],
@@ -100,6 +233,45 @@ def player_stats(player_id):
         }
     })
 
+# Player Analytics
+def _analytics_args(args):
+    """Read the stat and Category/University filters shared by the analytics endpoints"""
+    stat = args.get('stat', 'points')
+    if stat not in player_store.NUMERIC_FIELDS:
+        raise ValueError(f"stat must be one of {', '.join(player_store.NUMERIC_FIELDS)}")
+    return stat, {'category': args.get('category'), 'university': args.get('university')}
+
+@admin_bp.route('/players/top')
+@jwt_required()
+def top_players():
+    if get_jwt_identity() != 'admin':
+        return jsonify({"msg": "Admin access required"}), 403
+    
+    try:
+        stat, filters = _analytics_args(request.args)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    k = max(1, min(request.args.get('k', 10, type=int), 1000))
+    
+    store = player_store.get_store()
+    rows = store.top(stat, k, ascending=request.args.get('order') == 'asc', **filters)
+    return jsonify(store.records(rows, player_store.TEXT_FIELDS + [stat]))
+
+@admin_bp.route('/players/histogram')
+@jwt_required()
+def player_histogram():
+    if get_jwt_identity() != 'admin':
+        return jsonify({"msg": "Admin access required"}), 403
+    
+    try:
+        stat, filters = _analytics_args(request.args)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    bins = max(1, min(request.args.get('bins', 10, type=int), 200))
+    
+    counts, edges = player_store.get_store().histogram(stat, bins, **filters)
+    return jsonify({'stat': stat, 'counts': counts.tolist(), 'edges': edges.round(2).tolist()})
+
 # Tournament Summary
 @admin_bp.route('/tournament/summary')
 @jwt_required()
@@ -107,39 +279,20 @@ def tournament_summary():
     if get_jwt_identity() != 'admin':
         return jsonify({"msg": "Admin access required"}), 403
     
-    # Total runs and wickets
-    pipeline = [{
-        '$group': {
-            '_id': None,
-            'total_runs': {'$sum': '$Total_Runs'},
-            'total_wickets': {'$sum': '$Wickets'}
-        }
-    }]
-    summary = list(mongo.db.players.aggregate(pipeline))[0]
+    return jsonify(summary.get_summary())
 
-    # Highest run scorer
-    top_scorer = mongo.db.players.find_one(
-        sort=[("Total_Runs", -1)]
-    )
+# Cache Statistics
+@admin_bp.route('/cache/stats')
+@jwt_required()
+def cache_stats():
+    if get_jwt_identity() != 'admin':
+        return jsonify({"msg": "Admin access required"}), 403
     
-    # Highest wicket taker
-    top_wicket_taker = mongo.db.players.find_one(
-        sort=[("Wickets", -1)]
-    )
-
     return jsonify({
-        'total_runs': summary['total_runs'],
-        'total_wickets': summary['total_wickets'],
-        'top_scorer': {
-            'name': top_scorer['Name'],
-            'runs': top_scorer['Total_Runs'],
-            'university': top_scorer['University']
-        },
-        'top_wicket_taker': {
-            'name': top_wicket_taker['Name'],
-            'wickets': top_wicket_taker['Wickets'],
-            'university': top_wicket_taker['University']
-        }
+        'player_catalog': catalog.stats(),
+        'player_store': player_store.get_store().stats(),
+        'leaderboard': leaderboard.stats(),
+        'rate_limit': ratelimit.stats()
     })
 
 # Real-Time Updates WebSocket Handler
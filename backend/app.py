@@ -2,15 +2,24 @@ from flask import Flask
 from flask_jwt_extended import JWTManager
 from config import Config
 from services.database import mongo, initialize_data
-from services.realtime import socketio, init_realtime
+from services.realtime import socketio, init_realtime, watcher_health, relay_manager, SocketJSON
 from admin.routes import admin_bp
 from user.routes import user_bp
-from services.utils import update_player_values
-from flask import Flask
+from services.utils import update_player_values, refresh_values_command
+from services.ingest import ingest_players_command
+from services.teams import refresh_team_snapshots, refresh_teams_command
+from services.performances import ensure_collection as ensure_performances
+from services.indexes import ensure_indexes, ensure_indexes_command, check_indexes_command
+from services.passwords import init_password_hashing
+from services.ratelimit import init_rate_limit
+from services.metrics import init_metrics, command_listener
+from services.json_codec import MongoJSONProvider
+from flask import Flask, jsonify
 from flask_cors import CORS
 from extensions import bcrypt, jwt, socketio, mongo
 
 app = Flask(__name__)
+app.json = MongoJSONProvider(app)
 CORS(app, 
      resources={r"/admin/*": {
          "origins": ["http://localhost:5173"],
@@ -22,19 +31,56 @@ bcrypt.init_app(app)
 app.config.from_object(Config)
 
 # Initialize extensions
-mongo.init_app(app)
+mongo.init_app(app, event_listeners=[command_listener])
 with app.app_context():
+    try:
+        ensure_performances()
+    except Exception as e:
+        # Time-series collections need MongoDB 5.0; the rest of the app works without one
+        app.config['PERFORMANCES_ENABLED'] = False
+        app.logger.error(f"Performances collection unavailable, match ingest disabled: {str(e)}")
+    try:
+        # Before seeding, so the sample data's Name upserts use the unique index
+        skip = () if app.config.get('PERFORMANCES_ENABLED', True) else ('performances',)
+        indexes = ensure_indexes(skip=skip)
+        app.logger.info(f"Indexes: {len(indexes['created'])} created, {indexes['existing']} present "
+                        f"({indexes['elapsed_ms']}ms)")
+        if indexes['unregistered']:
+            app.logger.info(f"Indexes outside the registry: {', '.join(indexes['unregistered'])}")
+    except Exception as e:
+        app.logger.error(f"Index creation failed: {str(e)}")
     initialize_data(app)
-    update_player_values()
+    refresh = update_player_values()
+    app.logger.info(f"Filled in {refresh['modified']} missing player values in {refresh['elapsed_ms']}ms")
+    migrated = refresh_team_snapshots()
+    app.logger.info(f"Built team snapshots for {migrated['modified']} users in {migrated['elapsed_ms']}ms")
 
 jwt.init_app(app)
-socketio.init_app(app, cors_allowed_origins="*")
+init_password_hashing(app)
+init_rate_limit(app)
+socketio.init_app(app, cors_allowed_origins="*", json=SocketJSON,
+                  async_mode=app.config['SOCKETIO_ASYNC_MODE'],
+                  client_manager=relay_manager(app.config['SOCKETIO_MESSAGE_QUEUE']))
 
 init_realtime(app)
+init_metrics(app)
 
 # Register blueprints
 app.register_blueprint(admin_bp, url_prefix='/admin')
 app.register_blueprint(user_bp, url_prefix='/user')
 
+# Health checks
+@app.route('/health/realtime')
+def realtime_health():
+    health = watcher_health()
+    return jsonify(health), 200 if health['healthy'] else 503
+
+# CLI commands
+app.cli.add_command(ingest_players_command)
+app.cli.add_command(refresh_values_command)
+app.cli.add_command(refresh_teams_command)
+app.cli.add_command(ensure_indexes_command)
+app.cli.add_command(check_indexes_command)
+
 if __name__ == '__main__':
     socketio.run(app, host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
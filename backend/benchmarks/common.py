@@ -0,0 +1,97 @@
+from flask import Flask
+from pymongo import monitoring
+from config import Config
+from extensions import mongo
+import argparse
+import json
+import time
+
+DEFAULT_URI = "mongodb://localhost:27017/fantasy_cricket_bench"
+MONGOMOCK_SCHEME = "mongomock://"
+
+
+class QueryCounter(monitoring.CommandListener):
+    """Count the commands issued to MongoDB"""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def make_app(uri):
+    """Build a bare Flask app bound to the benchmark database.
+
+    A ``mongomock://<db>`` URI binds an in-memory stand-in instead, for
+    running offline without a mongod. It needs the mongomock package,
+    issues no command events (queries are not counted) and lacks some
+    aggregation operators.
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['MONGO_URI'] = uri
+    counter = QueryCounter()
+    if uri.startswith(MONGOMOCK_SCHEME):
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("mongomock:// URIs need the mongomock package (pip install mongomock)")
+        mongo.cx = mongomock.MongoClient()
+        mongo.db = mongo.cx[uri[len(MONGOMOCK_SCHEME):].strip('/') or 'fantasy_cricket_bench']
+    else:
+        mongo.init_app(app, event_listeners=[counter])
+    return app, counter
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies):
+    """Summarize a list of latencies (in seconds) in milliseconds"""
+    total = sum(latencies)
+    return {
+        'requests': len(latencies),
+        'throughput_per_s': round(len(latencies) / total, 1) if total else 0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3)
+    }
+
+
+def measure(fn, iterations, counter=None):
+    """Call ``fn`` repeatedly, returning its latency summary and queries per call"""
+    latencies = []
+    queries = counter.count if counter else 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    result = summarize(latencies)
+    if counter:
+        result['queries_per_request'] = round((counter.count - queries) / iterations, 2)
+    return result
+
+
+def parser(description):
+    """Argument parser with the options every benchmark shares"""
+    args = argparse.ArgumentParser(description=description)
+    args.add_argument('--uri', default=DEFAULT_URI,
+                      help='MongoDB URI of a scratch database, or mongomock://<db> to run in memory')
+    args.add_argument('--iterations', type=int, default=1000)
+    return args
+
+
+def report(name, results):
+    """Print benchmark results as one JSON document"""
+    print(json.dumps({'benchmark': name, **results}, indent=2))
@@ -0,0 +1,65 @@
+"""Encoding cost of catalog bodies and change-event batches, old path vs json_codec.
+
+The old catalog path copied every player to stringify its _id before the
+stdlib encoder ran; the old change-event path went BSON -> extended JSON
+-> Python objects -> Socket.IO's JSON. Needs no database.
+
+    python -m benchmarks.json_encoding --players 5000 --batch 500
+"""
+from benchmarks.common import measure, parser, report
+from benchmarks.seed import synthetic_players
+from services import json_codec
+from services.realtime import change_delta
+from bson import ObjectId, json_util
+from datetime import datetime, timezone
+import json
+
+CATALOG_FIELDS = ("Name", "University", "Category", "value")
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--players', type=int, default=5000)
+    args.add_argument('--batch', type=int, default=500, help='Change events per batch')
+    args.set_defaults(iterations=200)
+    args = args.parse_args()
+
+    players = [{'_id': ObjectId(), **player} for player in synthetic_players(args.players)]
+    catalog = [{field: player[field] for field in ('_id',) + CATALOG_FIELDS} for player in players]
+
+    now = datetime.now(timezone.utc)
+    batch = {'operation': 'batch', 'changes': [change_delta({
+        'operationType': 'update',
+        'documentKey': {'_id': player['_id']},
+        'updateDescription': {'updatedFields': {
+            'points': player['points'], 'Total_Runs': player['Total_Runs'],
+            'last_performance': {'match_id': 'm1', 'at': now, 'points_delta': 1.5}
+        }, 'removedFields': []}
+    }) for player in players[:args.batch]]}
+
+    def old_catalog():
+        return json.dumps([{**player, '_id': str(player['_id'])} for player in catalog],
+                          separators=(',', ':')).encode()
+
+    def old_batch():
+        return json.dumps(json.loads(json_util.dumps(batch)), separators=(',', ':'))
+
+    report('json_encoding', {
+        'encoder': 'orjson' if json_codec.orjson is not None else 'json',
+        'catalog': {
+            'players': len(catalog),
+            'bytes': len(json_codec.dumpb(catalog)),
+            'old': measure(old_catalog, args.iterations),
+            'json_codec': measure(lambda: json_codec.dumpb(catalog), args.iterations)
+        },
+        'change_batch': {
+            'changes': len(batch['changes']),
+            'bytes': len(json_codec.dumpb(batch)),
+            'old': measure(old_batch, args.iterations),
+            'json_codec': measure(lambda: json_codec.dumps(batch), args.iterations)
+        }
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""POST /user/login throughput at a fixed p99 target, and the refresh-token path.
+
+Sweeps client concurrency and reports logins/sec and latency percentiles at
+each level, plus the highest throughput whose p99 stays under --p99-ms.
+Run once with --hash-workers 0 (hashing on the request thread) and once
+with the process pool to compare.
+
+    python -m benchmarks.login_throughput --rounds 12 --hash-workers 4
+"""
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.common import make_app, parser, report, summarize
+from extensions import jwt, mongo, socketio
+from services.passwords import init_password_hashing, hash_password
+from user.routes import user_bp
+import time
+
+
+def run_level(app, usernames, concurrency, iterations, path, payload, headers=None):
+    def call(i):
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post(path, json=payload(i) if payload else None, headers=headers)
+        assert response.status_code == 200, response.status_code
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = list(pool.map(call, range(iterations)))
+    result = summarize(latencies)
+    result['concurrency'] = concurrency
+    result['throughput_per_s'] = round(iterations / (time.perf_counter() - started), 1)
+    return result
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--users', type=int, default=50)
+    args.add_argument('--rounds', type=int, default=12, help='bcrypt work factor')
+    args.add_argument('--hash-workers', type=int, default=4, help='0 hashes on the request thread')
+    args.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    args.add_argument('--p99-ms', type=float, default=500)
+    args.set_defaults(iterations=200)
+    args = args.parse_args()
+
+    app, _ = make_app(args.uri)
+    app.config['BCRYPT_LOG_ROUNDS'] = args.rounds
+    app.config['PASSWORD_HASH_WORKERS'] = args.hash_workers
+    jwt.init_app(app)
+    socketio.init_app(app)
+    init_password_hashing(app)
+    app.register_blueprint(user_bp, url_prefix='/user')
+
+    with app.app_context():
+        mongo.db.users.drop()
+        hashed = hash_password('benchmark-password')
+        usernames = [f"bench{i}" for i in range(args.users)]
+        mongo.db.users.insert_many([{"username": name, "password": hashed, "budget": 9000000,
+                                     "team": [], "total_points": 0} for name in usernames])
+
+        def credentials(i):
+            return {"username": usernames[i % len(usernames)], "password": "benchmark-password"}
+
+        logins = [run_level(app, usernames, level, args.iterations, '/user/login', credentials)
+                  for level in args.concurrency]
+        refresh_token = app.test_client().post('/user/login', json=credentials(0)).json['refresh_token']
+        refreshes = [run_level(app, usernames, level, args.iterations, '/user/refresh', None,
+                               {"Authorization": f"Bearer {refresh_token}"})
+                     for level in args.concurrency]
+
+        within_target = [level for level in logins if level['p99_ms'] <= args.p99_ms]
+        report('login_throughput', {
+            'rounds': args.rounds,
+            'hash_workers': args.hash_workers,
+            'p99_target_ms': args.p99_ms,
+            'logins_per_s_at_target': max((l['throughput_per_s'] for l in within_target), default=0),
+            'logins': logins,
+            'refreshes': refreshes
+        })
+        mongo.db.users.drop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""POST /admin/performances from several concurrent live matches: rows/sec and batch latency.
+
+Each match streams ball-by-ball rows for its 22 players in batches, while
+--users fantasy teams hold those players and receive the points deltas.
+
+    python -m benchmarks.performance_ingest --matches 8 --batch 6
+"""
+from concurrent.futures import ThreadPoolExecutor
+from flask_jwt_extended import create_access_token
+from benchmarks.common import make_app, parser, report, summarize
+from extensions import jwt, mongo, socketio
+from admin.routes import admin_bp
+from services.performances import ensure_collection
+from services.teams import TEAM_SIZE, team_entry
+import random
+import time
+
+
+def ball(player_ids, rng):
+    """One delivery: runs to a batter, a ball bowled by a bowler, sometimes a wicket"""
+    batter, bowler = rng.sample(player_ids, 2)
+    runs = rng.choice([0, 0, 1, 1, 2, 4, 6])
+    return [
+        {"player_id": batter, "Total_Runs": runs, "Balls_Faced": 1},
+        {"player_id": bowler, "Overs_Bowled": 1 / 6, "Runs_Conceded": runs, "Wickets": int(rng.random() < 0.05)}
+    ]
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--matches', type=int, default=8, help='Concurrent live matches')
+    args.add_argument('--batch', type=int, default=6, help='Balls per ingest call')
+    args.add_argument('--users', type=int, default=2000)
+    args.set_defaults(iterations=50)
+    args = args.parse_args()
+
+    app, counter = make_app(args.uri)
+    jwt.init_app(app)
+    socketio.init_app(app)
+    app.register_blueprint(admin_bp, url_prefix='/admin')
+
+    with app.app_context():
+        for collection in ('players', 'users', 'performances'):
+            mongo.db.drop_collection(collection)
+        ensure_collection()
+        mongo.db.users.create_index("team.player_id")
+        players = [{
+            "Name": f"Player {i}", "University": "University", "Category": "All-Rounder", "points": 0, "value": 500000
+        } for i in range(22 * args.matches)]
+        mongo.db.players.insert_many(players)
+        squads = [[str(p["_id"]) for p in players[m * 22:(m + 1) * 22]] for m in range(args.matches)]
+
+        rng = random.Random(0)
+        mongo.db.users.insert_many([{
+            "username": f"fan{i}", "budget": 0, "points_history": [],
+            "team": [team_entry(p) for p in rng.sample(players, TEAM_SIZE)]
+        } for i in range(args.users)])
+        headers = {"Authorization": f"Bearer {create_access_token(identity='admin')}"}
+
+        def play(match):
+            rng = random.Random(match)
+            client = app.test_client()
+            latencies = []
+            for _ in range(args.iterations):
+                rows = [row for _ in range(args.batch) for row in ball(squads[match], rng)]
+                started = time.perf_counter()
+                response = client.post('/admin/performances', json={"match_id": f"match{match}", "rows": rows},
+                                       headers=headers)
+                assert response.status_code == 200, response.json
+                latencies.append(time.perf_counter() - started)
+            return latencies
+
+        queries = counter.count
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.matches) as pool:
+            latencies = [latency for match in pool.map(play, range(args.matches)) for latency in match]
+        elapsed = time.perf_counter() - started
+
+        rows = mongo.db.performances.count_documents({})
+        report('performance_ingest', {
+            'matches': args.matches,
+            'rows_per_batch': 2 * args.batch,
+            'rows': rows,
+            'rows_per_sec': round(rows / elapsed),
+            'queries_per_batch': round((counter.count - queries) / len(latencies), 2),
+            'batches': summarize(latencies)
+        })
+        for collection in ('players', 'users', 'performances'):
+            mongo.db.drop_collection(collection)
+
+
+if __name__ == '__main__':
+    main()
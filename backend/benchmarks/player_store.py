@@ -0,0 +1,51 @@
+"""Analytics reads: Mongo queries vs the in-memory PlayerStore.
+
+    python -m benchmarks.player_store --players 10000
+"""
+from benchmarks.common import make_app, measure, parser, report
+from extensions import mongo
+from services.player_store import get_store
+from services.summary import get_summary
+import random
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--players', type=int, default=10000)
+    args.set_defaults(iterations=200)
+    args = args.parse_args()
+
+    app, counter = make_app(args.uri)
+    with app.app_context():
+        rng = random.Random(0)
+        mongo.db.players.drop()
+        mongo.db.players.insert_many([{
+            "Name": f"Player {i}", "University": f"University {i % 12}",
+            "Category": rng.choice(["Batsman", "Bowler", "All-Rounder"]),
+            "Total_Runs": rng.randrange(1000), "Wickets": rng.randrange(50),
+            "economy": round(rng.uniform(3, 12), 2), "points": round(rng.uniform(0, 150), 2)
+        } for i in range(args.players)])
+        store = get_store()
+
+        report('player_store', {
+            'players': args.players,
+            'top_10_bowlers_by_economy': {
+                'mongo': measure(lambda: list(mongo.db.players.find({"Category": "Bowler"}, {"Name": 1, "economy": 1})
+                                              .sort("economy", 1).limit(10)), args.iterations, counter),
+                'store': measure(lambda: store.records(store.top("economy", 10, ascending=True, category="Bowler"),
+                                                       ["Name", "economy"]), args.iterations, counter)
+            },
+            'points_histogram': {
+                'mongo': measure(lambda: list(mongo.db.players.aggregate([{"$bucketAuto": {
+                    "groupBy": "$points", "buckets": 20}}])), args.iterations, counter),
+                'store': measure(lambda: store.histogram("points", 20), args.iterations, counter)
+            },
+            'tournament_summary': {
+                'store': measure(get_summary, args.iterations, counter)
+            }
+        })
+        mongo.db.players.drop()
+
+
+if __name__ == '__main__':
+    main()
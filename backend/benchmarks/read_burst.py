@@ -0,0 +1,82 @@
+"""Match-start burst: many clients reading the leaderboard and catalog at once.
+
+Each round invalidates the leaderboard snapshot and the catalog cache,
+then fires --clients concurrent requests at each endpoint and counts the
+MongoDB commands the burst cost. With request coalescing this stays at
+about one query per endpoint however many clients join the burst.
+
+    python -m benchmarks.read_burst --clients 64 128 512
+"""
+from concurrent.futures import ThreadPoolExecutor
+from flask_jwt_extended import create_access_token
+from benchmarks.common import make_app, parser, report, summarize
+from extensions import jwt, mongo, socketio
+from services import catalog, leaderboard
+from user.routes import user_bp
+import threading
+import time
+
+ENDPOINTS = {
+    'leaderboard': ('/user/leaderboard?limit=50', leaderboard.invalidate),
+    'catalog': ('/user/players', catalog.invalidate)
+}
+
+
+def burst(app, path, headers, clients):
+    """Release ``clients`` requests together and return their latencies"""
+    gate = threading.Barrier(clients)
+
+    def call(_):
+        client = app.test_client()
+        gate.wait()
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, response.status_code
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(clients) as pool:
+        return list(pool.map(call, range(clients)))
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--clients', type=int, nargs='+', default=[16, 64, 256])
+    args.add_argument('--users', type=int, default=10000)
+    args.add_argument('--players', type=int, default=2000)
+    args.set_defaults(iterations=5)
+    args = args.parse_args()
+
+    app, counter = make_app(args.uri)
+    jwt.init_app(app)
+    socketio.init_app(app)
+    app.register_blueprint(user_bp, url_prefix='/user')
+
+    with app.app_context():
+        mongo.db.players.drop()
+        mongo.db.users.drop()
+        mongo.db.players.insert_many([{"Name": f"Player {i}", "University": "University", "Category": "Batsman",
+                                       "value": 100000 + 50000 * (i % 40)} for i in range(args.players)])
+        mongo.db.users.insert_many([{"username": f"fan{i}", "total_points": i % 997, "team": []}
+                                    for i in range(args.users)])
+        mongo.db.users.create_index([("total_points", -1), ("_id", 1)])
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity=str(mongo.db.users.find_one()['_id']))}
+
+        runs = []
+        for clients in args.clients:
+            for name, (path, invalidate) in ENDPOINTS.items():
+                latencies, queries = [], []
+                for _ in range(args.iterations):
+                    invalidate()
+                    before = counter.count
+                    latencies += burst(app, path, headers, clients)
+                    queries.append(counter.count - before)
+                runs.append({'endpoint': name, 'clients': clients, **summarize(latencies),
+                             'queries_per_burst': round(sum(queries) / len(queries), 2)})
+        mongo.db.players.drop()
+        mongo.db.users.drop()
+
+    report('read_burst', {'runs': runs})
+
+
+if __name__ == '__main__':
+    main()
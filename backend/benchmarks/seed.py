@@ -0,0 +1,115 @@
+"""Synthetic players and users at any scale, shaped like sample_data.csv.
+
+Each player copies the category of a random sample row and its stats
+scaled by a random factor, so the mix of batsmen, bowlers and all-rounders
+and their stat ranges follow the sample. Derived fields are computed the
+same way ingest does. Users get random, budget-respecting partial teams.
+
+    python -m benchmarks.seed --players 5000 --users 20000
+"""
+from benchmarks.common import make_app, parser
+from extensions import mongo
+from services.ingest import prepare_chunk
+from services.passwords import hash_password, init_password_hashing
+from services.teams import TEAM_SIZE, team_entry
+import json
+import os
+import random
+import pandas as pd
+
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_data.csv')
+BUDGET = 9000000
+PASSWORD = 'benchmark-password'
+
+
+def synthetic_players(count, seed=0, sample_csv=SAMPLE_CSV):
+    """``count`` player documents with the sample CSV's columns plus derived fields"""
+    rng = random.Random(seed)
+    sample = pd.read_csv(sample_csv)
+    numeric = [column for column in sample.columns if pd.api.types.is_numeric_dtype(sample[column])]
+    rows = sample.to_dict('records')
+    universities = sorted(sample['University'].unique())
+
+    synthetic = []
+    for i in range(count):
+        template = rng.choice(rows)
+        row = {'Name': f"{template['Name']} {i}", 'University': rng.choice(universities),
+               'Category': template['Category']}
+        for column in numeric:
+            row[column] = max(0, round(template[column] * rng.uniform(0.5, 1.5)))
+        synthetic.append(row)
+    return prepare_chunk(pd.DataFrame(synthetic, columns=sample.columns)).to_dict('records')
+
+
+def synthetic_users(count, players, team_fill=0.5, seed=0, password_hash=None):
+    """``count`` user documents; about ``team_fill`` of a full team is picked per user"""
+    rng = random.Random(seed)
+    users = []
+    for i in range(count):
+        size = min(TEAM_SIZE, max(0, round(rng.gauss(team_fill * TEAM_SIZE, 2))))
+        team, budget = [], BUDGET
+        for player in rng.sample(players, min(len(players), size * 2)):
+            if len(team) == size:
+                break
+            if player['value'] <= budget:
+                team.append(team_entry(player))
+                budget -= player['value']
+        team_points = round(sum(entry['points'] for entry in team), 2)
+        users.append({
+            'username': f"bench_user_{i}",
+            'password': password_hash,
+            'budget': budget,
+            'team': team,
+            'team_value': BUDGET - budget,
+            'team_points': team_points,
+            'total_points': team_points if len(team) == TEAM_SIZE else 0,
+            'points_history': []
+        })
+    return users
+
+
+def seed_database(players=2000, users=5000, team_fill=0.5, seed=0, batch=5000):
+    """Replace the players and users collections with synthetic data.
+
+    Must run inside an app context with password hashing initialized.
+    Returns the inserted players (with _id) and the users' password.
+    """
+    mongo.db.players.drop()
+    mongo.db.users.drop()
+    mongo.db.players.create_index('Name', unique=True)
+    mongo.db.users.create_index('username', unique=True)
+    mongo.db.users.create_index([('total_points', -1), ('_id', 1)])
+    mongo.db.users.create_index('team.player_id')
+
+    player_docs = synthetic_players(players, seed)
+    for start in range(0, len(player_docs), batch):
+        mongo.db.players.insert_many(player_docs[start:start + batch])
+
+    # One hash shared by every user keeps seeding fast at any bcrypt cost
+    user_docs = synthetic_users(users, player_docs, team_fill, seed, hash_password(PASSWORD))
+    for start in range(0, len(user_docs), batch):
+        mongo.db.users.insert_many(user_docs[start:start + batch])
+    return player_docs, PASSWORD
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--players', type=int, default=2000)
+    args.add_argument('--users', type=int, default=5000)
+    args.add_argument('--team-fill', type=float, default=0.5, help='Average fraction of a full team per user')
+    args.add_argument('--rounds', type=int, default=4, help='bcrypt work factor of the seeded passwords')
+    args.add_argument('--seed', type=int, default=0)
+    args = args.parse_args()
+
+    app, _ = make_app(args.uri)
+    app.config['BCRYPT_LOG_ROUNDS'] = args.rounds
+    app.config['PASSWORD_HASH_WORKERS'] = 0
+    init_password_hashing(app)
+    with app.app_context():
+        seed_database(args.players, args.users, args.team_fill, args.seed)
+        print(json.dumps({'players': mongo.db.players.count_documents({}),
+                          'users': mongo.db.users.count_documents({})}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Socket.IO connection scaling across worker processes sharing a message queue.
+
+For each worker count, starts that many app processes on consecutive ports
+with SOCKETIO_MESSAGE_QUEUE set, connects --clients-per-worker Socket.IO
+clients to each one and subscribes them to player updates. It then writes
+player updates and measures how many clients receive each batch and how
+long the fan-out takes. With a single change-stream leader publishing to
+the queue, delivered clients should grow linearly with workers while
+latency stays flat. Needs a replica-set mongod and the message queue.
+
+    python -m benchmarks.socket_scaling --workers 1 2 4 --queue redis://localhost:6379/0
+"""
+from benchmarks.common import parser, percentile, report
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import MongoClient
+import os
+import socketio
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_workers(count, base_port, uri, queue):
+    env = {**os.environ, 'MONGO_URI': uri, 'SOCKETIO_MESSAGE_QUEUE': queue}
+    workers = [subprocess.Popen(
+        [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(base_port + i)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    ) for i in range(count)]
+    time.sleep(5)  # let every worker bootstrap and elect stream leaders
+    return workers
+
+
+def connect_clients(ports, per_worker, received):
+    """Connect and subscribe clients round-robin, returning them and their connect latencies"""
+    def connect(port):
+        client = socketio.Client(reconnection=False)
+        client.on('player_update', lambda data: received.append(time.time()))
+        started = time.perf_counter()
+        client.connect(f'http://localhost:{port}', transports=['websocket'])
+        client.emit('subscribe', {'collection': 'players'})
+        return client, time.perf_counter() - started
+
+    with ThreadPoolExecutor(64) as pool:
+        results = list(pool.map(connect, [port for port in ports for _ in range(per_worker)]))
+    return [client for client, _ in results], [latency for _, latency in results]
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args.add_argument('--clients-per-worker', type=int, default=200)
+    args.add_argument('--queue', default='redis://localhost:6379/0')
+    args.add_argument('--base-port', type=int, default=5100)
+    args.set_defaults(iterations=20)
+    args = args.parse_args()
+
+    players = MongoClient(args.uri).get_default_database().players
+    player_id = players.insert_one({"Name": "Scaling Probe", "points": 0}).inserted_id
+    runs = []
+    try:
+        for count in args.workers:
+            ports = [args.base_port + i for i in range(count)]
+            workers = start_workers(count, args.base_port, args.uri, args.queue)
+            received = []
+            try:
+                clients, connect_latencies = connect_clients(ports, args.clients_per_worker, received)
+                time.sleep(1)
+
+                fanout, delivered = [], []
+                for i in range(args.iterations):
+                    received.clear()
+                    written = time.time()
+                    players.update_one({"_id": player_id}, {"$set": {"points": i + 1}})
+                    time.sleep(1)
+                    delivered.append(len(received) / len(clients))
+                    fanout.extend(at - written for at in received)
+
+                runs.append({
+                    'workers': count,
+                    'clients': len(clients),
+                    'clients_per_worker': len(clients) / count,
+                    'connect_p50_ms': round(percentile(connect_latencies, 50) * 1000, 1),
+                    'connect_p99_ms': round(percentile(connect_latencies, 99) * 1000, 1),
+                    'delivered_ratio': round(sum(delivered) / len(delivered), 4),
+                    'fanout_p50_ms': round(percentile(fanout, 50) * 1000, 1) if fanout else None,
+                    'fanout_p99_ms': round(percentile(fanout, 99) * 1000, 1) if fanout else None
+                })
+                for client in clients:
+                    client.disconnect()
+            finally:
+                for worker in workers:
+                    worker.terminate()
+                for worker in workers:
+                    worker.wait()
+    finally:
+        players.delete_one({"_id": player_id})
+
+    report('socket_scaling', {'queue': args.queue, 'runs': runs})
+
+
+if __name__ == '__main__':
+    main()
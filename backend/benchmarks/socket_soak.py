@@ -0,0 +1,95 @@
+"""Connection soak for a single Socket.IO server process.
+
+Ramps up subscribed clients against a running server in steps and, after
+each step, measures the event round-trip (a subscribe call acknowledged by
+the server) and, with --fanout, the latency of player update batches
+fanned out from the change stream. Compare a threaded `flask run` with
+`python serve.py` (eventlet) to see sockets per process and emit latency.
+
+    python -m benchmarks.socket_soak --url http://localhost:5000 --steps 500 1000 2000
+"""
+from benchmarks.common import parser, percentile, report
+from pymongo import MongoClient
+import asyncio
+import socketio
+import time
+
+
+def summarize_ms(samples):
+    if not samples:
+        return None
+    return {'p50': round(percentile(samples, 50) * 1000, 1), 'p99': round(percentile(samples, 99) * 1000, 1)}
+
+
+async def connect(url, received):
+    client = socketio.AsyncClient(reconnection=False)
+    client.on('player_update', lambda data: received.append(time.time()))
+    await client.connect(url, transports=['websocket'])
+    await client.call('subscribe', {'collection': 'players'}, timeout=10)
+    return client
+
+
+async def round_trips(clients, samples):
+    async def one(client):
+        started = time.perf_counter()
+        await client.call('subscribe', {'collection': 'players'}, timeout=10)
+        return time.perf_counter() - started
+    return await asyncio.gather(*(one(client) for client in clients[:samples]), return_exceptions=True)
+
+
+async def soak(args):
+    clients, received, steps = [], [], []
+    players = MongoClient(args.uri).get_default_database().players if args.fanout else None
+    probe = players.insert_one({"Name": "Soak Probe", "points": 0}).inserted_id if players is not None else None
+    try:
+        for target in args.steps:
+            failures = 0
+            while len(clients) < target:
+                batch = min(args.ramp, target - len(clients))
+                results = await asyncio.gather(*(connect(args.url, received) for _ in range(batch)),
+                                               return_exceptions=True)
+                clients.extend(r for r in results if not isinstance(r, BaseException))
+                failures += sum(isinstance(r, BaseException) for r in results)
+                if failures > target:
+                    break
+
+            trips = await round_trips(clients, args.samples)
+            fanout = []
+            if players is not None:
+                for i in range(args.iterations):
+                    received.clear()
+                    written = time.time()
+                    players.update_one({"_id": probe}, {"$set": {"points": i + 1}})
+                    await asyncio.sleep(1)
+                    fanout.extend(at - written for at in received)
+
+            steps.append({
+                'sockets': len(clients),
+                'connect_failures': failures,
+                'round_trip_ms': summarize_ms([t for t in trips if not isinstance(t, BaseException)]),
+                'fanout_ms': summarize_ms(fanout),
+                'delivered_ratio': round(len(fanout) / (len(clients) * args.iterations), 4) if fanout else None
+            })
+    finally:
+        await asyncio.gather(*(client.disconnect() for client in clients), return_exceptions=True)
+        if probe is not None:
+            players.delete_one({"_id": probe})
+    return steps
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--url', default='http://localhost:5000')
+    args.add_argument('--steps', type=int, nargs='+', default=[250, 500, 1000, 2000])
+    args.add_argument('--ramp', type=int, default=100, help='Clients connected concurrently')
+    args.add_argument('--samples', type=int, default=200, help='Clients timed per round-trip step')
+    args.add_argument('--fanout', action='store_true',
+                      help='Update a probe player in --uri (the database the server watches) to time fan-out')
+    args.set_defaults(iterations=5)
+    args = args.parse_args()
+
+    report('socket_soak', {'url': args.url, 'steps': asyncio.run(soak(args))})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Parallel POST /user/team/add calls for one user: latency and budget correctness.
+
+    python -m benchmarks.team_add_race --uri mongodb://localhost:27017/fantasy_cricket_bench
+"""
+from concurrent.futures import ThreadPoolExecutor
+from flask_jwt_extended import create_access_token
+from benchmarks.common import make_app, parser, report, summarize
+from extensions import jwt, mongo, socketio
+from user.routes import user_bp, TEAM_SIZE
+import time
+
+BUDGET = 9000000
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--threads', type=int, default=32)
+    args.add_argument('--players', type=int, default=40, help='Players each user tries to add')
+    args.set_defaults(iterations=20)
+    args = args.parse_args()
+
+    app, counter = make_app(args.uri)
+    jwt.init_app(app)
+    socketio.init_app(app)
+    app.register_blueprint(user_bp, url_prefix='/user')
+
+    with app.app_context():
+        mongo.db.players.drop()
+        mongo.db.users.drop()
+        player_ids = [str(player_id) for player_id in mongo.db.players.insert_many([{
+            "Name": f"Player {i}", "University": "University", "Category": "Batsman",
+            "value": 850000 + 50000 * (i % 5)
+        } for i in range(args.players)]).inserted_ids]
+
+        latencies, violations = [], 0
+        queries = counter.count
+        for round_ in range(args.iterations):
+            user_id = mongo.db.users.insert_one({
+                "username": f"racer{round_}", "budget": BUDGET, "team": [], "total_points": 0
+            }).inserted_id
+            headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+            def add(player_id):
+                client = app.test_client()
+                started = time.perf_counter()
+                client.post('/user/team/add', json={"player_id": player_id}, headers=headers)
+                return time.perf_counter() - started
+
+            # Every thread races to add every player, most of them twice
+            with ThreadPoolExecutor(args.threads) as pool:
+                latencies.extend(pool.map(add, player_ids * 2))
+
+            user = mongo.db.users.find_one({"_id": user_id})
+            picked = [p['player_id'] for p in user['team']]
+            spent = sum(p['value'] for p in user['team'])
+            if (len(picked) != len(set(picked)) or len(picked) > TEAM_SIZE
+                    or user['budget'] != BUDGET - spent or user['budget'] < 0):
+                violations += 1
+
+        result = summarize(latencies)
+        result['queries_per_request'] = round((counter.count - queries) / len(latencies), 2)
+        report('team_add_race', {'users': args.iterations, 'threads': args.threads,
+                                 'violations': violations, 'adds': result})
+        mongo.db.players.drop()
+        mongo.db.users.drop()
+
+
+if __name__ == '__main__':
+    main()
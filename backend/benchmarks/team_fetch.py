@@ -0,0 +1,66 @@
+"""GET /user/team player lookup: one find_one per player vs the denormalized team snapshot.
+
+    python -m benchmarks.team_fetch --uri mongodb://localhost:27017/fantasy_cricket_bench
+"""
+from bson import ObjectId
+from benchmarks.common import make_app, measure, parser, report
+from extensions import mongo
+from services.teams import team_entry
+
+
+def fetch_team_players_per_player(team):
+    """The original lookup: one round-trip per rostered player"""
+    team_details = []
+    for player in team:
+        player_data = mongo.db.players.find_one(
+            {"_id": ObjectId(player['player_id'])},
+            {'points': 0}
+        )
+        if player_data:
+            team_details.append({
+                "player_id": str(player_data["_id"]),
+                "Name": player_data["Name"],
+                "University": player_data["University"],
+                "value": player_data.get("value", 0)
+            })
+    return team_details
+
+
+def fetch_team_snapshot(user_id):
+    """The current lookup: the team is read straight off the user document"""
+    return mongo.db.users.find_one({"_id": user_id}, {"team": 1})["team"]
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--players', type=int, default=5000, help='Size of the seeded catalog')
+    args = args.parse_args()
+
+    app, counter = make_app(args.uri)
+    with app.app_context():
+        mongo.db.players.drop()
+        mongo.db.users.drop()
+        result = mongo.db.players.insert_many([{
+            "Name": f"Player {i}",
+            "University": f"University {i % 8}",
+            "Category": "Batsman",
+            "points": float(i % 100),
+            "value": 500000
+        } for i in range(args.players)])
+        picked = result.inserted_ids[::max(1, args.players // 11)][:11]
+        team = [team_entry(player) for player in mongo.db.players.find({"_id": {"$in": picked}})]
+        user_id = mongo.db.users.insert_one({"username": "bench", "team": team}).inserted_id
+
+        assert [p["Name"] for p in fetch_team_snapshot(user_id)] == \
+            [p["Name"] for p in fetch_team_players_per_player(team)]
+        report('team_fetch', {
+            'team_size': len(team),
+            'before': measure(lambda: fetch_team_players_per_player(team), args.iterations, counter),
+            'after': measure(lambda: fetch_team_snapshot(user_id), args.iterations, counter)
+        })
+        mongo.db.players.drop()
+        mongo.db.users.drop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Lineup optimizer vs greedy selection: latency and points on synthetic player pools.
+
+Runs in memory, so no database is needed.
+
+    python -m benchmarks.team_suggest --players 1000 3000 10000
+"""
+from bson import ObjectId
+from benchmarks.common import measure, parser, report
+from config import Config
+from services.optimizer import PlayerPool, suggest_lineup, greedy_lineup
+from services.scoring import player_value
+import random
+
+BUDGET = 9000000
+
+
+def synthetic_players(count, universities, seed):
+    """Players with points spread like a season's stats and values derived from them"""
+    rng = random.Random(seed)
+    players = []
+    for i in range(count):
+        points = max(0.0, rng.gauss(60, 25))
+        players.append({
+            "_id": ObjectId(), "Name": f"Player {i}", "University": f"University {rng.randrange(universities)}",
+            "Category": rng.choice(list(Config.TEAM_CATEGORY_LIMITS)), "points": round(points, 2),
+            "value": player_value(points)
+        })
+    return players
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--players', type=int, nargs='+', default=[50, 1000, 3000, 10000])
+    args.add_argument('--universities', type=int, default=10)
+    args.add_argument('--cap', type=int, default=Config.TEAM_UNIVERSITY_CAP)
+    args.set_defaults(iterations=20)
+    args = args.parse_args()
+
+    limits = Config.TEAM_CATEGORY_LIMITS
+    results = []
+    for count in args.players:
+        pool = PlayerPool(synthetic_players(count, args.universities, seed=count), limits)
+        exact, optimal = suggest_lineup(pool, [], BUDGET, limits, args.cap)
+        greedy = greedy_lineup(pool, [], BUDGET, limits, args.cap)
+        results.append({
+            'players': count,
+            'optimizer': {
+                **measure(lambda: suggest_lineup(pool, [], BUDGET, limits, args.cap), args.iterations),
+                'points': round(float(pool.points[exact].sum()), 2) if exact else None,
+                'exact': optimal
+            },
+            'greedy': {
+                **measure(lambda: greedy_lineup(pool, [], BUDGET, limits, args.cap), args.iterations),
+                'points': round(float(pool.points[greedy].sum()), 2) if greedy else None
+            }
+        })
+    report('team_suggest', {'university_cap': args.cap, 'budget': BUDGET, 'pools': results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""Mixed user traffic against the user and admin blueprints, plus Socket.IO fan-out.
+
+Seeds synthetic players and users (see benchmarks.seed), then replays a
+seeded random schedule of --iterations requests drawn from --mix across
+--concurrency threads, reporting throughput and per-operation latency
+percentiles. Rejections the API is expected to give under contention
+(budget, full team, player not in team) count as served, not as errors.
+
+The fan-out phase subscribes --sockets in-process Socket.IO clients to
+player updates, writes player changes and times each batch from the
+change event reaching the batcher to every client holding it. Fan-out
+through real change streams and worker processes is covered by
+benchmarks.socket_scaling.
+
+Runs against any scratch mongod, or fully offline in memory:
+
+    python -m benchmarks.traffic_mix --uri mongomock://bench --players 2000 --users 5000
+    python -m benchmarks.traffic_mix --mix login=5 leaderboard=60 catalog=35 --concurrency 16
+"""
+from concurrent.futures import ThreadPoolExecutor
+from flask_jwt_extended import create_access_token
+from benchmarks.common import MONGOMOCK_SCHEME, make_app, parser, report, summarize
+from benchmarks.seed import seed_database
+from extensions import jwt, mongo, socketio
+from services.passwords import init_password_hashing
+from services.realtime import ChangeBatcher
+from pymongo.errors import OperationFailure
+from user.routes import user_bp
+from admin.routes import admin_bp
+from collections import Counter, defaultdict
+import random
+import time
+import uuid
+
+DEFAULT_MIX = {
+    'login': 5, 'signup': 2, 'team': 20, 'team_add': 10, 'team_remove': 8,
+    'leaderboard': 30, 'catalog': 20, 'summary': 5
+}
+
+# Status codes each operation answers when it worked as designed
+EXPECTED = {
+    'signup': {201}, 'login': {200}, 'team': {200}, 'team_add': {200, 400},
+    'team_remove': {200, 404}, 'leaderboard': {200}, 'catalog': {200, 304}, 'summary': {200}
+}
+
+# Operations whose writes need update pipeline operators the backend may lack
+PIPELINE_OPERATIONS = ('team_add', 'team_remove')
+
+
+class Traffic:
+    """The seeded data and tokens the scripted operations draw on"""
+
+    def __init__(self, app, players, password):
+        self.app = app
+        self.password = password
+        self.player_ids = [str(player['_id']) for player in players]
+        self.categories = sorted({player['Category'] for player in players})
+        with app.app_context():
+            self.users = [(user['username'], create_access_token(identity=str(user['_id'])),
+                           [entry['player_id'] for entry in user['team']])
+                          for user in mongo.db.users.find({}, {'username': 1, 'team.player_id': 1})]
+            self.admin = {'Authorization': 'Bearer ' + create_access_token(identity='admin')}
+
+    def run(self, operation, rng):
+        client = self.app.test_client()
+        username, token, team = rng.choice(self.users)
+        auth = {'Authorization': f'Bearer {token}'}
+        if operation == 'signup':
+            return client.post('/user/signup', json={'username': f'mix_{uuid.uuid4().hex}',
+                                                     'password': self.password})
+        if operation == 'login':
+            return client.post('/user/login', json={'username': username, 'password': self.password})
+        if operation == 'team':
+            return client.get('/user/team', headers=auth)
+        if operation == 'team_add':
+            return client.post('/user/team/add', json={'player_id': rng.choice(self.player_ids)}, headers=auth)
+        if operation == 'team_remove':
+            player_id = rng.choice(team) if team else rng.choice(self.player_ids)
+            return client.delete(f'/user/team/remove/{player_id}', headers=auth)
+        if operation == 'leaderboard':
+            return client.get('/user/leaderboard?limit=50', headers=auth)
+        if operation == 'catalog':
+            category = rng.choice([None] + self.categories)
+            return client.get('/user/players' + (f'/{category}' if category else ''), headers=auth)
+        if operation == 'summary':
+            return client.get('/admin/tournament/summary', headers=self.admin)
+        raise ValueError(f"Unknown operation {operation}")
+
+
+def supports_pipeline_updates():
+    """Whether the backend runs the $round/$unset update pipelines the team writes use"""
+    probe = mongo.db.traffic_mix_probe
+    probe.insert_one({'_id': 1, 'x': 1.234})
+    try:
+        probe.update_one({'_id': 1}, [{'$set': {'x': {'$round': ['$x', 1]}}}, {'$unset': 'y'}])
+        return True
+    except (OperationFailure, NotImplementedError):
+        return False
+    finally:
+        probe.drop()
+
+
+def parse_mix(entries):
+    mix = {}
+    for entry in entries:
+        operation, _, weight = entry.partition('=')
+        if operation not in EXPECTED:
+            raise SystemExit(f"Unknown operation {operation}; choose from {', '.join(EXPECTED)}")
+        mix[operation] = float(weight or 1)
+    return mix
+
+
+def run_mix(traffic, mix, iterations, concurrency, seed):
+    rng = random.Random(seed)
+    operations = list(mix)
+    schedule = rng.choices(operations, weights=[mix[op] for op in operations], k=iterations)
+    seeds = [rng.random() for _ in schedule]
+
+    def call(i):
+        started = time.perf_counter()
+        response = traffic.run(schedule[i], random.Random(seeds[i]))
+        return schedule[i], response.status_code, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(call, range(iterations)))
+    elapsed = time.perf_counter() - started
+
+    latencies, statuses = defaultdict(list), defaultdict(Counter)
+    for operation, status, latency in results:
+        latencies[operation].append(latency)
+        statuses[operation][status] += 1
+    per_operation = {}
+    for operation in operations:
+        if not latencies[operation]:
+            continue
+        per_operation[operation] = {
+            **summarize(latencies[operation]),
+            'statuses': {str(status): count for status, count in sorted(statuses[operation].items())},
+            'errors': sum(count for status, count in statuses[operation].items()
+                          if status not in EXPECTED[operation])
+        }
+    return {
+        'requests': iterations,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_per_s': round(iterations / elapsed, 1),
+        'overall': summarize([latency for _, _, latency in results]),
+        'operations': per_operation
+    }
+
+
+def run_fanout(app, players, sockets, rounds):
+    """Time player update batches from the batcher to every subscribed client"""
+    clients = [socketio.test_client(app) for _ in range(sockets)]
+    for client in clients:
+        client.emit('subscribe', {'collection': 'players'})
+        client.get_received()
+
+    batcher = ChangeBatcher('player_update', 'players_updates')
+    latencies, delivered = [], []
+    for i in range(rounds):
+        player = players[i % len(players)]
+        points = round(player['points'] + i + 1, 2)
+        mongo.db.players.update_one({'_id': player['_id']}, {'$set': {'points': points}})
+        started = time.perf_counter()
+        batcher.add({'operationType': 'update', 'documentKey': {'_id': player['_id']},
+                     'updateDescription': {'updatedFields': {'points': points}, 'removedFields': []}})
+        batcher.flush()
+        latencies.append(time.perf_counter() - started)
+        delivered.append(sum(any(message['name'] == 'player_update' for message in client.get_received())
+                             for client in clients))
+
+    for client in clients:
+        client.disconnect()
+    return {
+        'clients': sockets,
+        'batches': rounds,
+        'delivered_ratio': round(sum(delivered) / (sockets * rounds), 4) if sockets and rounds else None,
+        **{key: value for key, value in summarize(latencies).items() if key != 'throughput_per_s'}
+    }
+
+
+def main():
+    args = parser(__doc__)
+    args.add_argument('--players', type=int, default=2000)
+    args.add_argument('--users', type=int, default=5000)
+    args.add_argument('--team-fill', type=float, default=0.5)
+    args.add_argument('--mix', nargs='+', metavar='OPERATION=WEIGHT',
+                      help=f"Operation weights (default: {' '.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())})")
+    args.add_argument('--concurrency', type=int, default=8)
+    args.add_argument('--rounds', type=int, default=4, help='bcrypt work factor for signup and login')
+    args.add_argument('--sockets', type=int, default=200, help='Socket.IO clients in the fan-out phase')
+    args.add_argument('--socket-rounds', type=int, default=50)
+    args.add_argument('--seed', type=int, default=0)
+    args.set_defaults(iterations=5000)
+    args = args.parse_args()
+
+    app, counter = make_app(args.uri)
+    app.config['BCRYPT_LOG_ROUNDS'] = args.rounds
+    jwt.init_app(app)
+    socketio.init_app(app)
+    init_password_hashing(app)
+    app.register_blueprint(user_bp, url_prefix='/user')
+    app.register_blueprint(admin_bp, url_prefix='/admin')
+
+    with app.app_context():
+        started = time.perf_counter()
+        players, password = seed_database(args.players, args.users, args.team_fill, args.seed)
+        seeded_s = round(time.perf_counter() - started, 3)
+
+        mix = parse_mix(args.mix) if args.mix else dict(DEFAULT_MIX)
+        skipped = []
+        if not supports_pipeline_updates():
+            skipped = [operation for operation in PIPELINE_OPERATIONS if operation in mix]
+            for operation in skipped:
+                del mix[operation]
+
+        traffic = Traffic(app, players, password)
+        queries = counter.count
+        results = run_mix(traffic, mix, args.iterations, args.concurrency, args.seed)
+        if not args.uri.startswith(MONGOMOCK_SCHEME):
+            results['queries_per_request'] = round((counter.count - queries) / args.iterations, 2)
+        fanout = run_fanout(app, players, args.sockets, args.socket_rounds) if args.sockets else None
+
+    report('traffic_mix', {
+        'backend': 'mongomock' if args.uri.startswith(MONGOMOCK_SCHEME) else 'mongod',
+        'players': args.players,
+        'users': args.users,
+        'seed': args.seed,
+        'seed_s': seeded_s,
+        'concurrency': args.concurrency,
+        'mix': mix,
+        'skipped_unsupported': skipped,
+        **results,
+        'fanout': fanout
+    })
+
+
+if __name__ == '__main__':
+    main()
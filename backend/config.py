@@ -2,6 +2,22 @@ import os
 from datetime import timedelta
 
 class Config:
-    MONGO_URI = "mongodb://localhost:27017/fantasy_cricket"
+    MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/fantasy_cricket")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET", "@SecretKey!123")
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
\ No newline at end of file
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+    # Lineup rules applied by /user/team/suggest: (min, max) players per category
+    TEAM_CATEGORY_LIMITS = {"Batsman": (3, 6), "Bowler": (3, 6), "All-Rounder": (1, 4)}
+    TEAM_UNIVERSITY_CAP = int(os.getenv("TEAM_UNIVERSITY_CAP", "3"))
+    REALTIME_BATCH_WINDOW = float(os.getenv("REALTIME_BATCH_WINDOW", "0.25"))
+    # e.g. redis://localhost:6379/0; enables multi-worker mode when set
+    SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE")
+    # threading, eventlet or gevent; auto-detected when unset
+    SOCKETIO_ASYNC_MODE = os.getenv("SOCKETIO_ASYNC_MODE")
+    # Log requests slower than this many milliseconds with their Mongo commands; 0 disables
+    SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+    # Per-client token bucket on /user routes, keyed by JWT identity or IP; 0 disables
+    RATE_LIMIT_PER_SEC = float(os.getenv("RATE_LIMIT_PER_SEC", "10"))
+    RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "30"))
@@ -0,0 +1,23 @@
+"""Production entry point running the app under an async Socket.IO worker.
+
+    SOCKETIO_ASYNC_MODE=eventlet python serve.py
+
+The standard library is monkey patched before anything else is imported,
+so pymongo queries, change stream waits and socket I/O yield to other
+green threads instead of blocking the worker.
+"""
+import os
+
+ASYNC_MODE = os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'eventlet')
+
+if ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+from app import app, socketio  # noqa: E402
+
+if __name__ == '__main__':
+    socketio.run(app, host=os.getenv('HOST', '0.0.0.0'), port=int(os.getenv('PORT', 5000)))
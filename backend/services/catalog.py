@@ -0,0 +1,76 @@
+from services.database import mongo
+from services.realtime import on_change
+from services import json_codec
+from services.singleflight import SingleFlight
+import hashlib
+import threading
+
+# Player fields exposed by the catalog endpoints; changes to anything else
+# (match stats, derived ratios) leave the cached catalog valid
+CATALOG_FIELDS = ("Name", "University", "Category", "value")
+
+_entries = {}
+_version = 0
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+# Concurrent misses for the same catalog share one read
+_flight = SingleFlight()
+
+
+def _serialize(category):
+    """Build the JSON body for the full catalog or for a single category"""
+    query = {} if category is None else {"Category": category}
+    players = mongo.db.players.find(query, {field: 1 for field in CATALOG_FIELDS})
+    body = json_codec.dumpb([{
+        "_id": player["_id"],
+        "Name": player["Name"],
+        "University": player["University"],
+        **({"Category": player["Category"]} if category is None else {}),
+        "value": player.get("value", 0)
+    } for player in players])
+    return body, hashlib.md5(body).hexdigest()
+
+
+def get(category=None):
+    """Return the serialized catalog and its ETag, reading through to Mongo on a miss"""
+    with _lock:
+        entry = _entries.get(category)
+        if entry is not None:
+            _stats["hits"] += 1
+            return entry
+        _stats["misses"] += 1
+        version = _version
+
+    entry = _flight.do((category, version), lambda: _serialize(category))
+    with _lock:
+        # Only cache the entry if no invalidation raced with the read, and
+        # never cache unknown categories so arbitrary URLs can't grow the cache
+        if version == _version and (category is None or entry[0] != b'[]'):
+            _entries[category] = entry
+    return entry
+
+
+def invalidate():
+    """Drop every cached catalog body"""
+    global _version
+    with _lock:
+        _entries.clear()
+        _version += 1
+        _stats["invalidations"] += 1
+
+
+def stats():
+    """Return the cache hit/miss counters"""
+    with _lock:
+        return {**_stats, "entries": len(_entries), "coalesced_misses": _flight.stats['shared']}
+
+
+@on_change('players')
+def _invalidate_on_catalog_change(change):
+    """Invalidate the catalog unless an update left every catalog field untouched"""
+    if change['operationType'] == 'update':
+        description = change.get('updateDescription', {})
+        touched = list(description.get('updatedFields', {})) + description.get('removedFields', [])
+        if not any(field.split('.')[0] in CATALOG_FIELDS for field in touched):
+            return
+    invalidate()
@@ -0,0 +1,186 @@
+from extensions import mongo
+from flask.cli import with_appcontext
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from bson import ObjectId
+import click
+import logging
+import time
+
+# Every index the app relies on, per collection, as (keys, options). Each
+# one serves a query shape in QUERY_SHAPES below or enforces uniqueness.
+INDEXES = {
+    'players': [
+        ([('Name', ASCENDING)], {'unique': True}),
+        # Catalog by category, and the admin listing sorted by Category
+        ([('Category', ASCENDING), ('_id', ASCENDING)], {}),
+        # Admin listing sorted by value, and the value backfill at startup
+        ([('value', ASCENDING), ('_id', ASCENDING)], {}),
+        # Admin listing filtered by category and sorted by value
+        ([('Category', ASCENDING), ('value', ASCENDING), ('_id', ASCENDING)], {}),
+    ],
+    'users': [
+        ([('username', ASCENDING)], {'unique': True}),
+        # Leaderboard pages and rank counts
+        ([('total_points', DESCENDING), ('_id', ASCENDING)], {}),
+        # Team snapshot sync and match ingest fan-out to the users holding a player
+        ([('team.player_id', ASCENDING)], {}),
+    ],
+    'performances': [
+        ([('meta.player_id', ASCENDING), ('ts', ASCENDING)], {}),
+    ],
+}
+
+_SAMPLE_ID = ObjectId('000000000000000000000000')
+
+# Filters and sorts the routes and services issue, with representative
+# values, as (name, collection, filter, sort). check_query_plans() explains
+# each one; full-collection reads such as the PlayerStore load are left out.
+QUERY_SHAPES = [
+    ('player by _id', 'players', {'_id': _SAMPLE_ID}, None),
+    ('players by _id list', 'players', {'_id': {'$in': [_SAMPLE_ID]}}, None),
+    ('player by Name', 'players', {'Name': 'Sample Player'}, None),
+    ('catalog by category', 'players', {'Category': 'Batsman'}, None),
+    ('listing by _id', 'players', {'_id': {'$gt': _SAMPLE_ID}}, [('_id', ASCENDING)]),
+    ('listing by value', 'players', {}, [('value', DESCENDING), ('_id', DESCENDING)]),
+    ('listing by value page', 'players',
+     {'$or': [{'value': {'$gt': 100000}}, {'value': 100000, '_id': {'$gt': _SAMPLE_ID}}]},
+     [('value', ASCENDING), ('_id', ASCENDING)]),
+    ('listing by Category', 'players', {}, [('Category', ASCENDING), ('_id', ASCENDING)]),
+    ('listing of a category by value', 'players', {'Category': 'Batsman'},
+     [('value', DESCENDING), ('_id', DESCENDING)]),
+    ('players missing a value', 'players', {'value': {'$exists': False}}, None),
+    ('user by username', 'users', {'username': 'sample'}, None),
+    ('user by _id', 'users', {'_id': _SAMPLE_ID}, None),
+    ('leaderboard page', 'users',
+     {'total_points': {'$type': 'number'},
+      '$or': [{'total_points': {'$lt': 100}}, {'total_points': 100, '_id': {'$gt': _SAMPLE_ID}}]},
+     [('total_points', DESCENDING), ('_id', ASCENDING)]),
+    ('leaderboard top', 'users', {'total_points': {'$type': 'number'}},
+     [('total_points', DESCENDING), ('_id', ASCENDING)]),
+    ('rank count', 'users', {'total_points': {'$gt': 100}}, None),
+    ('users holding a player', 'users', {'team.player_id': str(_SAMPLE_ID)}, None),
+    ('complete teams holding a player', 'users',
+     {'team.player_id': str(_SAMPLE_ID), 'team.10': {'$exists': True}}, None),
+    ('performances of a player', 'performances', {'meta.player_id': _SAMPLE_ID},
+     [('ts', ASCENDING)]),
+]
+
+
+def _key(keys):
+    return tuple((field, int(direction)) for field, direction in keys)
+
+
+def ensure_indexes(drop_unregistered=False, skip=()):
+    """Create the registered indexes that are missing.
+
+    Must run after the performances time-series collection exists, or
+    its index would create it as a regular collection; pass
+    ``skip=('performances',)`` when it could not be created. Run it before
+    seeding, so the Name upserts of the first ingest use the unique index.
+
+    Existing indexes are compared by key pattern and left alone, so a boot
+    against an up-to-date database costs one listIndexes per collection.
+    An index whose options differ from the registry is reported, not
+    rebuilt. Indexes outside the registry are reported, and dropped only
+    with ``drop_unregistered=True``. A collection whose indexes fail to
+    build (e.g. duplicate Names under the unique index) is reported in
+    ``failed`` and the others are still reconciled.
+    """
+    started = time.perf_counter()
+    stats = {'created': [], 'existing': 0, 'mismatched': [], 'unregistered': [], 'dropped': [], 'failed': []}
+    for collection, specs in INDEXES.items():
+        if collection in skip:
+            continue
+        existing = {_key(info['key']): (name, info)
+                    for name, info in mongo.db[collection].index_information().items()}
+        wanted = {_key(keys): options for keys, options in specs}
+
+        missing = []
+        for keys, options in specs:
+            found = existing.get(_key(keys))
+            if found is None:
+                missing.append(IndexModel(keys, **options))
+            elif any(found[1].get(option) != value for option, value in options.items()):
+                stats['mismatched'].append(f"{collection}.{found[0]}")
+            else:
+                stats['existing'] += 1
+        if missing:
+            try:
+                stats['created'] += [f"{collection}.{name}" for name in mongo.db[collection].create_indexes(missing)]
+            except OperationFailure as e:
+                stats['failed'].append(collection)
+                logging.error(f"Creating indexes on {collection} failed: {str(e)}")
+
+        for key, (name, _) in existing.items():
+            if key == (('_id', 1),) or key in wanted:
+                continue
+            if drop_unregistered:
+                mongo.db[collection].drop_index(name)
+                stats['dropped'].append(f"{collection}.{name}")
+            else:
+                stats['unregistered'].append(f"{collection}.{name}")
+
+    if stats['mismatched']:
+        logging.warning(f"Indexes differing from the registry (drop them to rebuild): "
+                        f"{', '.join(stats['mismatched'])}")
+    stats['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return stats
+
+
+def _stages(explain):
+    """Yield every stage of every winning plan in an explain document.
+
+    Plans sit at different depths for time-series collections (under an
+    aggregation $cursor stage) and for slot-based execution (queryPlan),
+    so the whole document is walked.
+    """
+    if isinstance(explain, list):
+        for item in explain:
+            yield from _stages(item)
+    elif isinstance(explain, dict):
+        if 'stage' in explain:
+            yield explain['stage']
+        for key, value in explain.items():
+            if key not in ('rejectedPlans', 'allPlansExecution', 'executionStats'):
+                yield from _stages(value)
+
+
+def check_query_plans():
+    """Explain every registered query shape; return those whose winning plan scans a collection"""
+    failures = []
+    for name, collection, query, sort in QUERY_SHAPES:
+        cursor = mongo.db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = set(_stages(cursor.limit(50).explain()))
+        if 'COLLSCAN' in stages:
+            failures.append({'shape': name, 'collection': collection, 'stages': sorted(s for s in stages if s)})
+    return failures
+
+
+@click.command('ensure-indexes')
+@click.option('--drop-unregistered', is_flag=True, help='Drop indexes that are not in the registry.')
+@with_appcontext
+def ensure_indexes_command(drop_unregistered):
+    """Create missing registered indexes."""
+    stats = ensure_indexes(drop_unregistered=drop_unregistered)
+    click.echo(f"Created {len(stats['created'])} indexes, {stats['existing']} already present "
+               f"in {stats['elapsed_ms']}ms")
+    for label in ('created', 'mismatched', 'unregistered', 'dropped', 'failed'):
+        if stats[label]:
+            click.echo(f"{label.capitalize()}: {', '.join(stats[label])}")
+    if stats['failed']:
+        raise click.ClickException(f"Index creation failed on {', '.join(stats['failed'])}")
+
+
+@click.command('check-indexes')
+@with_appcontext
+def check_indexes_command():
+    """Fail if any registered query shape falls back to a collection scan."""
+    failures = check_query_plans()
+    for failure in failures:
+        click.echo(f"COLLSCAN: {failure['shape']} on {failure['collection']} ({', '.join(failure['stages'])})")
+    if failures:
+        raise click.ClickException(f"{len(failures)} of {len(QUERY_SHAPES)} query shapes scan a collection")
+    click.echo(f"All {len(QUERY_SHAPES)} query shapes use an index")
@@ -0,0 +1,65 @@
+from extensions import mongo
+from flask.cli import with_appcontext
+from pymongo import UpdateOne
+from services.scoring import score_frame
+import pandas as pd
+import click
+import time
+import logging
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def prepare_chunk(chunk):
+    """Clean a raw CSV chunk and add the derived stat columns"""
+    chunk.columns = [col.strip().replace(' ', '_') for col in chunk.columns]
+    chunk = chunk.dropna(subset=['Name'])
+    scored = score_frame(chunk)
+    return scored.astype(object).where(pd.notnull(scored), None)
+
+
+def ingest_csv(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream a player stats CSV into the players collection.
+
+    The file is read ``chunk_size`` rows at a time, so memory stays flat
+    regardless of its size. Every row is upserted on the unique ``Name``
+    index, which makes re-ingesting an updated dump safe on a live database.
+    """
+    stats = {'rows': 0, 'inserted': 0, 'updated': 0, 'chunks': 0}
+    started = time.perf_counter()
+
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        players = prepare_chunk(chunk).to_dict('records')
+        if not players:
+            continue
+
+        result = mongo.db.players.bulk_write([
+            UpdateOne({'Name': player['Name']}, {'$set': player}, upsert=True)
+            for player in players
+        ], ordered=False)
+
+        stats['rows'] += len(players)
+        stats['inserted'] += result.upserted_count
+        stats['updated'] += result.modified_count
+        stats['chunks'] += 1
+        logging.debug(f"Ingested chunk {stats['chunks']} ({len(players)} rows) from {path}")
+
+    elapsed = time.perf_counter() - started
+    stats['elapsed_s'] = round(elapsed, 3)
+    stats['rows_per_sec'] = round(stats['rows'] / elapsed) if elapsed else 0
+    return stats
+
+
+@click.command('ingest-players')
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True,
+              help='Rows read and written per batch.')
+@with_appcontext
+def ingest_players_command(paths, chunk_size):
+    """Upsert player stats from one or more CSV files."""
+    for path in paths:
+        stats = ingest_csv(path, chunk_size=chunk_size)
+        click.echo(
+            f"{path}: {stats['rows']} rows ({stats['inserted']} new, {stats['updated']} updated) "
+            f"in {stats['elapsed_s']}s, {stats['rows_per_sec']} rows/sec"
+        )
@@ -0,0 +1,100 @@
+from flask.json.provider import DefaultJSONProvider
+from bson import Decimal128, ObjectId
+from datetime import date, datetime
+import decimal
+import json
+import math
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # the stdlib fallback produces the same JSON, only slower
+    orjson = None
+
+
+def _default(obj):
+    """Encode the BSON and NumPy types found in documents.
+
+    ObjectIds become their hex string and Decimal128/Decimal a string, so
+    no precision is lost; datetimes are ISO 8601.
+    """
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumpb(obj, indent=False, sort_keys=False):
+        """Encode ``obj`` to UTF-8 JSON bytes"""
+        options = _OPTIONS | (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, default=_default, option=options)
+
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+else:
+    def _finite(obj):
+        """Copy of ``obj`` with NaN and infinities as None, as orjson writes them"""
+        if isinstance(obj, float):
+            return obj if math.isfinite(obj) else None
+        if isinstance(obj, dict):
+            return {key: _finite(value) for key, value in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [_finite(value) for value in obj]
+        if isinstance(obj, (np.generic, np.ndarray)):
+            return _finite(_default(obj))
+        return obj
+
+    def dumpb(obj, indent=False, sort_keys=False):
+        """Encode ``obj`` to UTF-8 JSON bytes"""
+        options = {'default': _default, 'ensure_ascii': False, 'sort_keys': sort_keys, 'allow_nan': False,
+                   'indent': 2 if indent else None, 'separators': None if indent else (',', ':')}
+        try:
+            return json.dumps(obj, **options).encode()
+        except ValueError as e:
+            if 'Out of range float' not in str(e):
+                raise
+            # Only documents holding NaN or infinities pay for the extra walk
+            return json.dumps(_finite(obj), **options).encode()
+
+    def loads(s, **kwargs):
+        return json.loads(s)
+
+def dumps(obj, **kwargs):
+    """Encode ``obj`` to a compact JSON string.
+
+    Takes and ignores the stdlib keyword arguments, so this module can
+    stand in for ``json`` (Socket.IO calls it with ``separators``).
+    """
+    return dumpb(obj).decode()
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider on the fast encoder, aware of BSON types.
+
+    Keys keep their insertion order instead of being sorted.
+    """
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        return dumpb(obj, indent=bool(kwargs.get('indent')), sort_keys=kwargs.get('sort_keys', False)).decode()
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(dumpb(obj, indent=indent, sort_keys=self.sort_keys) + b'\n',
+                                        mimetype=self.mimetype)
@@ -0,0 +1,54 @@
+from services.database import mongo
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+import os
+import socket
+import time
+
+# Seconds a lease stays valid without being renewed
+LEASE_TTL = 15
+
+
+class Lease:
+    """Mongo-backed lease electing a single holder among worker processes.
+
+    The holder renews the lease well before it expires; if it dies, another
+    worker takes over once the TTL has elapsed.
+    """
+
+    def __init__(self, name, ttl=LEASE_TTL):
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._renew_at = 0
+
+    @property
+    def renew_interval(self):
+        return self.ttl / 3
+
+    def acquire(self):
+        """Take or renew the lease, returning whether this process holds it"""
+        now = datetime.now(timezone.utc)
+        try:
+            mongo.db.leases.find_one_and_update(
+                {'_id': self.name, '$or': [{'owner': self.owner}, {'expires_at': {'$lt': now}}]},
+                {'$set': {'owner': self.owner, 'expires_at': now + timedelta(seconds=self.ttl)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Another live worker holds the lease
+            self._renew_at = 0
+            return False
+        self._renew_at = time.monotonic() + self.renew_interval
+        return True
+
+    def renew_if_due(self):
+        """Renew the lease when due, returning whether it is still held"""
+        if time.monotonic() < self._renew_at:
+            return True
+        return self.acquire()
+
+    def release(self):
+        mongo.db.leases.delete_one({'_id': self.name, 'owner': self.owner})
+        self._renew_at = 0
@@ -0,0 +1,127 @@
+from services.database import mongo
+from services.realtime import on_change
+from services.utils import decode_cursor
+from services.singleflight import SingleFlight
+from pymongo import ASCENDING, DESCENDING
+from bson import ObjectId
+import threading
+
+# Users with equal points are ordered by _id so pages never overlap
+LEADERBOARD_SORT = [("total_points", DESCENDING), ("_id", ASCENDING)]
+
+# Only players are ranked; users without total_points (the admin) are left out
+RANKED = {"total_points": {"$type": "number"}}
+
+# Number of leading entries kept in the in-process snapshot
+SNAPSHOT_SIZE = 100
+
+_snapshot = None
+_snapshot_version = 0
+_snapshot_lock = threading.Lock()
+# Concurrent identical reads (a burst of first-page requests right after an
+# invalidation, or the same cursor page) share one query
+_flight = SingleFlight()
+
+
+def _entry(user):
+    return {
+        "user_id": str(user["_id"]),
+        "username": user["username"],
+        "points": user["total_points"],
+        "_sort": (user["total_points"], user["_id"])
+    }
+
+
+def parse_cursor(cursor):
+    """Decode a leaderboard page cursor into its (points, _id) sort key"""
+    after = decode_cursor(cursor)
+    if len(after) != 2 or isinstance(after[0], bool) or \
+            not isinstance(after[0], (int, float)) or not isinstance(after[1], ObjectId):
+        raise ValueError("Invalid cursor")
+    return after
+
+
+def _fetch(limit, after=None):
+    """Read one page of the leaderboard straight from the total_points index"""
+    query = dict(RANKED)
+    if after:
+        points, last_id = after
+        query["$or"] = [
+            {"total_points": {"$lt": points}},
+            {"total_points": points, "_id": {"$gt": last_id}}
+        ]
+    users = mongo.db.users.find(query, {"username": 1, "total_points": 1}) \
+        .sort(LEADERBOARD_SORT).limit(limit)
+    return [_entry(user) for user in users]
+
+
+def invalidate():
+    """Drop the cached top-N snapshot after a total_points change"""
+    global _snapshot, _snapshot_version
+    with _snapshot_lock:
+        _snapshot = None
+        _snapshot_version += 1
+
+
+def top_snapshot():
+    """Return the cached top SNAPSHOT_SIZE entries, rebuilding them on a miss"""
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is not None:
+            return _snapshot
+        version = _snapshot_version
+
+    entries = _flight.do(('snapshot', version), lambda: _fetch(SNAPSHOT_SIZE))
+    with _snapshot_lock:
+        # Only keep the snapshot if nothing changed while it was being read
+        if version == _snapshot_version:
+            _snapshot = entries
+    return entries
+
+
+def get_page(limit, after=None):
+    """Return up to ``limit`` entries after the ``after`` sort key, and whether more follow.
+
+    First pages within the snapshot are served from memory.
+    """
+    if after is None and limit < SNAPSHOT_SIZE:
+        entries = top_snapshot()
+        return entries[:limit], len(entries) > limit
+
+    with _snapshot_lock:
+        version = _snapshot_version
+    # Versioned like the snapshot, so a request after invalidate() never
+    # joins a read that started before the write
+    key = ('page', version, limit, None if after is None else tuple(after))
+    entries = _flight.do(key, lambda: _fetch(limit + 1, after))
+    return entries[:limit], len(entries) > limit
+
+
+def stats():
+    """Return how many leaderboard reads ran and how many were shared"""
+    with _snapshot_lock:
+        return {**_flight.stats, "snapshot_cached": _snapshot is not None}
+
+
+def get_rank(user_id):
+    """Return a user's 1-based rank and points, or None if the user does not exist"""
+    user = mongo.db.users.find_one({"_id": user_id}, {"total_points": 1})
+    if not user:
+        return None
+    points = user.get("total_points", 0)
+    with _snapshot_lock:
+        version = _snapshot_version
+    # Users on equal points share a rank, so concurrent lookups share the count
+    ahead = _flight.do(('rank', version, points),
+                       lambda: mongo.db.users.count_documents({"total_points": {"$gt": points}}))
+    return ahead + 1, points
+
+
+@on_change('users')
+def _invalidate_on_points_change(change):
+    """Invalidate the snapshot when a change event may have moved total_points"""
+    if change['operationType'] == 'update':
+        updated = change.get('updateDescription', {}).get('updatedFields', {})
+        if 'total_points' not in updated:
+            return
+    invalidate()
@@ -0,0 +1,197 @@
+from flask import Response, g, request
+from pymongo import monitoring
+from collections import defaultdict
+from contextvars import ContextVar
+import logging
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Requests slower than this many milliseconds are logged with their Mongo
+# commands; 0 turns the slow-request log off
+SLOW_REQUEST_MS = 0
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, help, labels, buckets):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self.series = defaultdict(lambda: [[0] * len(buckets), 0.0, 0])
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self.lock:
+            series = self.series[labels]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for labels, (counts, total, count) in sorted(self.series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), labels + (bound,))} "
+                                 f"{bucket_count}")
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), labels + ('+Inf',))} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {round(total, 6)}")
+                lines.append(f"{self.name}_count{_labels(self.labels, labels)} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values"""
+
+    def __init__(self, name, help, labels):
+        self.name, self.help, self.labels = name, help, labels
+        self.series = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, *labels):
+        with self.lock:
+            self.series[labels] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for labels, value in sorted(self.series.items()):
+                lines.append(f"{self.name}{_labels(self.labels, labels)} {value:g}")
+        return lines
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+request_latency = Histogram('http_request_duration_seconds', 'HTTP request latency by route.',
+                            ('blueprint', 'route', 'method'), LATENCY_BUCKETS)
+request_total = Counter('http_requests_total', 'HTTP requests by route and status.',
+                        ('blueprint', 'route', 'method', 'status'))
+request_queries = Histogram('http_request_mongo_commands', 'MongoDB commands issued per HTTP request.',
+                            ('blueprint', 'route', 'method'), QUERY_BUCKETS)
+request_db_time = Counter('http_request_mongo_seconds_total', 'Time spent in MongoDB commands by route.',
+                          ('blueprint', 'route', 'method'))
+command_latency = Histogram('mongo_command_duration_seconds', 'MongoDB command latency by command name.',
+                            ('command',), LATENCY_BUCKETS)
+command_failures = Counter('mongo_command_failures_total', 'Failed MongoDB commands by command name.',
+                           ('command',))
+emit_total = Counter('socketio_emits_total', 'Socket.IO events emitted by the server.', ('event',))
+emit_size = Histogram('socketio_emit_bytes', 'Serialized size of emitted Socket.IO payloads.',
+                      ('event',), SIZE_BUCKETS)
+
+REGISTRY = [request_latency, request_total, request_queries, request_db_time,
+            command_latency, command_failures, emit_total, emit_size]
+
+
+class RequestMetrics:
+    """Mongo activity attributed to the request being served"""
+
+    def __init__(self, capture):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        # Per-command detail is only kept when the slow-request log is on
+        self.commands = {} if capture else None
+
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Time every MongoDB command and charge it to the current request, if any.
+
+    Commands issued outside a request (change streams, startup jobs) only
+    feed the per-command histogram.
+    """
+
+    def started(self, event):
+        current = _current.get()
+        if current is None:
+            return
+        current.queries += 1
+        if current.commands is not None:
+            target = event.command.get(event.command_name)
+            current.commands[event.request_id] = {
+                'command': event.command_name,
+                'collection': target if isinstance(target, str) else None,
+                'ms': None
+            }
+
+    def _finished(self, event):
+        seconds = event.duration_micros / 1e6
+        command_latency.observe(seconds, event.command_name)
+        current = _current.get()
+        if current is not None:
+            current.db_seconds += seconds
+            if current.commands is not None and event.request_id in current.commands:
+                current.commands[event.request_id]['ms'] = round(seconds * 1000, 3)
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        command_failures.inc(1, event.command_name)
+        self._finished(event)
+
+
+command_listener = CommandMetrics()
+
+
+def record_emit(event, size):
+    """Count a server-side Socket.IO emit of ``size`` serialized bytes"""
+    emit_total.inc(1, event)
+    emit_size.observe(size, event)
+
+
+def _before_request():
+    g.request_metrics = RequestMetrics(capture=SLOW_REQUEST_MS > 0)
+    g.request_metrics_token = _current.set(g.request_metrics)
+
+
+def _after_request(response):
+    current = g.pop('request_metrics', None)
+    if current is None:
+        return response
+    _current.reset(g.pop('request_metrics_token'))
+
+    elapsed = time.perf_counter() - current.started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = (request.blueprint or '', route, request.method)
+    request_latency.observe(elapsed, *labels)
+    request_total.inc(1, *labels, response.status_code)
+    request_queries.observe(current.queries, *labels)
+    request_db_time.inc(current.db_seconds, *labels)
+
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        logging.warning(f"Slow request {request.method} {request.path} ({route}): "
+                        f"{round(elapsed * 1000, 1)}ms, {current.queries} Mongo commands in "
+                        f"{round(current.db_seconds * 1000, 1)}ms: {list(current.commands.values())}")
+    return response
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    return '\n'.join(line for metric in REGISTRY for line in metric.render()) + '\n'
+
+
+def init_metrics(app):
+    """Time every request and serve the collected metrics on /metrics.
+
+    The Mongo client must be created with ``command_listener`` among its
+    event listeners for commands to be attributed to requests.
+    """
+    global SLOW_REQUEST_MS
+    SLOW_REQUEST_MS = app.config.get('SLOW_REQUEST_MS', SLOW_REQUEST_MS)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics',
+                     lambda: Response(render(), mimetype='text/plain; version=0.0.4'))
@@ -0,0 +1,366 @@
+from services.player_store import get_store
+from services.scoring import VALUE_STEP
+from services.teams import TEAM_SIZE
+from collections import Counter
+import heapq
+import logging
+import threading
+import time
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Seconds of branch-and-bound search before falling back to greedy_lineup(),
+# and nodes explored before giving up when greedy finds nothing
+MAX_SEARCH_SECONDS = 0.05
+MAX_NODES = 500
+
+POOL_FIELDS = ["Name", "University", "Category", "points", "value"]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class SearchAborted(Exception):
+    """The lineup search hit MAX_NODES and the greedy fallback found no lineup"""
+
+
+class PlayerPool:
+    """Column arrays of every pickable player"""
+
+    def __init__(self, players, categories, version=None):
+        players = [p for p in players if p.get("Category") in categories]
+        self.version = version
+        self.players = players
+        self.ids = [str(p["_id"]) for p in players]
+        self.index = {player_id: i for i, player_id in enumerate(self.ids)}
+        self.categories = list(categories)
+        self.category = np.array([self.categories.index(p["Category"]) for p in players], dtype=np.int64)
+        self.universities = sorted({p.get("University") or "" for p in players})
+        self.university = np.array([self.universities.index(p.get("University") or "") for p in players],
+                                   dtype=np.int64)
+        self.points = np.array([p.get("points") or 0 for p in players], dtype=float)
+        self.value = np.array([p.get("value") or 0 for p in players], dtype=np.int64)
+        # Player values are multiples of VALUE_STEP, so costs fit a small integer range
+        self.cost = -(-self.value // VALUE_STEP)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def get_pool(categories):
+    """Return a PlayerPool of the player store, rebuilt whenever the store has changed"""
+    global _pool
+    store = get_store()
+    with _pool_lock:
+        pool = _pool
+    if pool is not None and pool.version == store.version and pool.categories == list(categories):
+        return pool
+
+    with store.lock:
+        version = store.version
+        players = store.records(np.flatnonzero(store.mask()), POOL_FIELDS)
+    pool = PlayerPool(players, categories, version)
+    with _pool_lock:
+        _pool = pool
+    return pool
+
+
+def _prune(pool, candidates, limit):
+    """Keep only players that can appear in an optimal pick of at most ``limit`` from one category.
+
+    A player is dropped when ``limit`` others cost no more and score at
+    least as many points; any lineup using it could swap in one of them.
+    """
+    if limit <= 0 or not len(candidates):
+        return np.array([], dtype=np.int64)
+    order = candidates[np.lexsort((-pool.points[candidates], pool.cost[candidates]))]
+
+    # Players at the same cost: only the best ``limit`` can matter
+    position = np.arange(len(order))
+    cost = pool.cost[order]
+    group_start = np.maximum.accumulate(np.where(np.r_[True, cost[1:] != cost[:-1]], position, 0))
+    order = order[position - group_start < limit]
+
+    kept, best = [], []
+    for i in order:
+        # best holds the top ``limit`` points seen among cheaper players
+        if len(best) < limit or pool.points[i] > best[0]:
+            kept.append(i)
+        if len(best) < limit:
+            heapq.heappush(best, pool.points[i])
+        elif pool.points[i] > best[0]:
+            heapq.heapreplace(best, pool.points[i])
+    return np.array(kept, dtype=np.int64)
+
+
+def _knapsack(pool, items, max_picks, budget):
+    """Best points for every (picks, cost) pair from one category's players.
+
+    Returns the DP table and, per item, where taking it improved the table
+    so the chosen players can be read back.
+    """
+    best = np.full((max_picks + 1, budget + 1), -np.inf)
+    best[0, 0] = 0
+    taken = []
+    for i in items:
+        cost = pool.cost[i]
+        if max_picks == 0 or cost > budget:
+            taken.append(None)
+            continue
+        candidate = best[:-1, :budget + 1 - cost] + pool.points[i]
+        improved = candidate > best[1:, cost:]
+        best[1:, cost:][improved] = candidate[improved]
+        taken.append(improved)
+    return best, taken
+
+
+def _read_back(pool, items, taken, picks, cost):
+    """Recover the players behind a knapsack table entry"""
+    chosen = []
+    for i, improved in zip(reversed(items), reversed(taken)):
+        if picks == 0:
+            break
+        item_cost = pool.cost[i]
+        if improved is not None and cost >= item_cost and improved[picks - 1, cost - item_cost]:
+            chosen.append(i)
+            picks -= 1
+            cost -= item_cost
+    return chosen
+
+
+def _fold(total, table, low, high):
+    """Max-plus convolve the running (picks, cost) table with one category's table.
+
+    Entries of the result combine ``low`` to ``high`` players of the
+    category with the best lineup so far for the remaining picks and budget.
+    """
+    rows, budget = total.shape[0], total.shape[1] - 1
+    combined = np.full_like(total, -np.inf)
+    filled = np.flatnonzero((total > -np.inf).any(axis=1))
+    if not len(filled):
+        return combined
+    first, last = filled[0], filled[-1]
+
+    # windows[k, b, j] is total[first + k, b + j - budget], -inf when out of range
+    padded = np.concatenate([np.full((last + 1 - first, budget), -np.inf), total[first:last + 1]], axis=1)
+    windows = sliding_window_view(padded, budget + 1, axis=1)
+    for picks in range(low, min(high, rows - 1 - first) + 1):
+        count = min(last, rows - 1 - picks) - first + 1
+        target = combined[first + picks:first + picks + count]
+        np.maximum(target, (windows[:count] + table[picks, ::-1]).max(axis=2), out=target)
+    return combined
+
+
+def _fold_last(total, table, low, high, slots):
+    """Best full lineup from the running table and the last category's table.
+
+    Only the ``slots`` row is needed, which reduces the convolution to a
+    running maximum over cost. Returns the points, the (picks, cost) taken
+    from the last category and the cost left to the others; points are
+    -inf if nothing fits.
+    """
+    budget = total.shape[1] - 1
+    best = (-np.inf, 0, 0, 0)
+    for picks in range(low, min(high, slots) + 1):
+        cheapest_best = np.maximum.accumulate(table[picks])
+        scores = total[slots - picks] + cheapest_best[::-1]
+        spent = int(scores.argmax())
+        if scores[spent] > best[0]:
+            best = (scores[spent], picks, int(table[picks, :budget - spent + 1].argmax()), spent)
+    return best
+
+
+def _unfold(total, table, low, high, picks_left, cost_left, score):
+    """Find the (picks, cost) a category contributed to a combined table entry"""
+    for picks in range(low, min(high, picks_left) + 1):
+        costs = np.arange(cost_left + 1)
+        scores = total[picks_left - picks, cost_left - costs] + table[picks, :cost_left + 1]
+        match = np.flatnonzero(scores == score)
+        if len(match):
+            return picks, int(match[0])
+    raise AssertionError("Combined lineup table is inconsistent")
+
+
+def _relaxed(pool, forced, excluded, limits, budget, tables):
+    """Solve the lineup ignoring university caps.
+
+    ``forced`` players are always in the lineup and ``excluded`` never are.
+    ``tables`` memoizes knapsack tables across the nodes of one search.
+    Returns (points, players) or None when no lineup fits.
+    """
+    slots = TEAM_SIZE - len(forced)
+    budget -= int(pool.cost[list(forced)].sum()) if forced else 0
+    if slots < 0 or budget < 0:
+        return None
+
+    forced_per_category = Counter(pool.category[i] for i in forced)
+    available = np.ones(len(pool), dtype=bool)
+    available[list(forced | excluded)] = False
+
+    categories = []
+    for c, category in enumerate(pool.categories):
+        low, high = limits[category]
+        low = max(0, low - forced_per_category[c])
+        high = min(slots, high - forced_per_category[c])
+        if high < low:
+            return None
+        items = _prune(pool, np.flatnonzero(available & (pool.category == c)), high)
+        key = (high, budget, items.tobytes())
+        if key not in tables:
+            tables[key] = _knapsack(pool, items, high, budget)
+        categories.append((low, high, items, *tables[key]))
+
+    # Folding costs grow with a category's pick range, so the widest range
+    # goes first (a plain copy) and second widest last (a single row)
+    categories.sort(key=lambda entry: entry[0] - entry[1])
+    first, *middle, last = categories
+    total = np.full((slots + 1, budget + 1), -np.inf)
+    low, high = first[0], min(first[1], slots)
+    total[low:high + 1] = first[3][low:high + 1]
+    totals = [total]
+    for low, high, _, table, _ in middle:
+        totals.append(_fold(totals[-1], table, low, high))
+
+    points, picks, cost, cost_left = _fold_last(totals[-1], last[3], last[0], last[1], slots)
+    if points == -np.inf:
+        return None
+
+    chosen = list(forced) + _read_back(pool, last[2], last[4], picks, cost)
+    picks_left = slots - picks
+    for (low, high, items, table, taken), total in zip(reversed(middle), reversed(totals[:-1])):
+        picks, cost = _unfold(total, table, low, high, picks_left, cost_left, totals[-1][picks_left, cost_left])
+        chosen += _read_back(pool, items, taken, picks, cost)
+        totals.pop()
+        picks_left, cost_left = picks_left - picks, cost_left - cost
+    chosen += _read_back(pool, first[2], first[4], picks_left, cost_left)
+    return float(pool.points[chosen].sum()), chosen
+
+
+def _over_cap(pool, chosen, cap):
+    """Return the first university with more than ``cap`` players in the lineup, if any"""
+    counts = Counter(pool.university[i] for i in chosen)
+    return next((u for u, count in counts.items() if count > cap), None)
+
+
+def _fits_caps(pool, locked, excluded, cap):
+    """Whether TEAM_SIZE players can be picked at all with at most ``cap`` per university"""
+    if _over_cap(pool, locked, cap) is not None:
+        return False
+    available = np.ones(len(pool), dtype=bool)
+    available[list(excluded)] = False
+    seats = np.minimum(np.bincount(pool.university[available], minlength=len(pool.universities)), cap)
+    return int(seats.sum()) >= TEAM_SIZE
+
+
+def suggest_lineup(pool, locked, budget, limits, cap):
+    """Points-maximizing TEAM_SIZE lineup containing the ``locked`` player indices.
+
+    Each node solves the lineup without university caps by knapsack DP
+    over value buckets; when the relaxed lineup over-fills a university,
+    the search branches on which of its free players to leave out. Nodes
+    are explored best-bound first, so the first lineup within the caps is
+    optimal. Returns (player indices, exact), or (None, True) if no lineup
+    fits.
+
+    A search still open after MAX_SEARCH_SECONDS returns greedy_lineup()
+    with ``exact`` False instead. If greedy finds nothing the search goes
+    on, and raises SearchAborted past MAX_NODES, since a lineup may still
+    exist.
+    """
+    money = budget
+    locked = frozenset(locked)
+    if not _fits_caps(pool, locked, frozenset(), cap):
+        return None, True
+
+    budget //= VALUE_STEP
+    tables = {}
+    root = _relaxed(pool, locked, frozenset(), limits, budget, tables)
+    if root is None:
+        return None, True
+
+    deadline = time.perf_counter() + MAX_SEARCH_SECONDS
+    frontier = [(-root[0], 0, locked, frozenset(), root[1])]
+    nodes = 1
+    while frontier:
+        _, _, forced, excluded, chosen = heapq.heappop(frontier)
+        university = _over_cap(pool, chosen, cap)
+        if university is None:
+            return chosen, True
+
+        members = [i for i in chosen if pool.university[i] == university and i not in forced]
+        for n, player in enumerate(members):
+            child_forced = forced | frozenset(members[:n])
+            child_excluded = excluded | {player}
+            if _over_cap(pool, child_forced, cap) is not None:
+                break
+            if not _fits_caps(pool, child_forced, child_excluded, cap):
+                continue
+            child = _relaxed(pool, child_forced, child_excluded, limits, budget, tables)
+            nodes += 1
+            if child is not None:
+                heapq.heappush(frontier, (-child[0], nodes, child_forced, child_excluded, child[1]))
+        if deadline is not None and time.perf_counter() > deadline:
+            lineup = greedy_lineup(pool, locked, money, limits, cap)
+            if lineup is not None:
+                logging.warning(f"Lineup search out of time after {nodes} nodes; returning the greedy lineup")
+                return lineup, False
+            # Greedy found nothing; keep searching up to MAX_NODES rather than give up
+            deadline = None
+        if nodes > MAX_NODES:
+            raise SearchAborted(f"No lineup found within {nodes} search nodes")
+    return None, True
+
+
+def _cheapest(costs, count, own=None):
+    """Sum of the ``count`` cheapest of the sorted ``costs`` prefix sums, leaving out one at ``own`` if given"""
+    if own is None or (count + 1 < len(costs) and own > costs[count + 1] - costs[count]):
+        return costs[count] if count < len(costs) else np.inf
+    return costs[count + 1] - own if count + 1 < len(costs) else np.inf
+
+
+def greedy_lineup(pool, locked, budget, limits, cap):
+    """Baseline for suggest_lineup(): take the highest scoring players that still fit.
+
+    Budget is held back for the cheapest fill of the remaining slots from
+    the players still pickable, category minimums included, so the greedy
+    pass does not strand itself.
+    """
+    chosen = list(locked)
+    spent = int(pool.value[chosen].sum())
+    per_category = Counter(pool.category[i] for i in chosen)
+    per_university = Counter(pool.university[i] for i in chosen)
+    minimums = np.array([limits[category][0] for category in pool.categories])
+    maximums = np.array([limits[category][1] for category in pool.categories])
+    categories = range(len(pool.categories))
+
+    def prefix_costs():
+        """Prefix sums of the sorted values of pickable players, overall and per category"""
+        pickable = np.ones(len(pool), dtype=bool)
+        pickable[chosen] = False
+        pickable &= np.array([per_university[u] < cap for u in range(len(pool.universities))])[pool.university]
+        pickable &= (np.array([per_category[c] for c in categories]) < maximums)[pool.category]
+        prefix = lambda values: np.cumsum(np.concatenate(([0], np.sort(values))))
+        return prefix(pool.value[pickable]), [prefix(pool.value[pickable & (pool.category == c)]) for c in categories]
+
+    costs, category_costs = prefix_costs()
+    for i in np.argsort(-pool.points, kind="stable"):
+        if len(chosen) == TEAM_SIZE:
+            break
+        c, u = pool.category[i], pool.university[i]
+        if i in chosen or per_university[u] >= cap or per_category[c] >= maximums[c]:
+            continue
+        needed = [max(0, minimums[k] - per_category[k] - (k == c)) for k in categories]
+        left = TEAM_SIZE - len(chosen) - 1
+        if sum(needed) > left:
+            continue
+        # Cheapest fill of the slots left after i, from the pickable players other than i
+        reserve = sum(_cheapest(category_costs[k], needed[k], pool.value[i] if k == c else None) for k in categories) + \
+            _cheapest(costs, left - sum(needed), pool.value[i])
+        if spent + pool.value[i] + reserve > budget:
+            continue
+        chosen.append(i)
+        spent += pool.value[i]
+        per_category[c] += 1
+        per_university[u] += 1
+        costs, category_costs = prefix_costs()
+    return chosen if len(chosen) == TEAM_SIZE else None
@@ -0,0 +1,98 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+import logging
+import bcrypt
+
+# bcrypt only uses the first 72 bytes of a password; older releases of the
+# library truncated silently, so keep doing that for existing hashes to verify
+MAX_PASSWORD_BYTES = 72
+
+_rounds = 12
+_pool = None
+_slots = None
+
+
+def _encode(password):
+    return password.encode('utf-8')[:MAX_PASSWORD_BYTES]
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(_encode(password), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password, hashed):
+    try:
+        return bcrypt.checkpw(_encode(password), hashed.encode('utf-8'))
+    except ValueError:
+        return False  # not a bcrypt hash
+
+
+def init_password_hashing(app):
+    """Configure the bcrypt work factor and the hashing process pool.
+
+    BCRYPT_LOG_ROUNDS sets the cost of new hashes. PASSWORD_HASH_WORKERS
+    bounds the pool (0 hashes on the calling thread instead); at most
+    PASSWORD_HASH_QUEUE hashes per worker wait in line, further callers block.
+    """
+    global _rounds, _pool, _slots
+    _rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+    workers = app.config.get('PASSWORD_HASH_WORKERS', multiprocessing.cpu_count())
+    if workers:
+        # Fork rather than spawn: spawned workers would re-run the app's entry
+        # module (Mongo setup, watchers) before they could hash anything
+        context = multiprocessing.get_context('fork') \
+            if 'fork' in multiprocessing.get_all_start_methods() else None
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        _slots = threading.BoundedSemaphore(workers * app.config.get('PASSWORD_HASH_QUEUE', 4))
+        # Start every worker now, while the process is still being set up,
+        # instead of forking on the first logins of a spike
+        for future in [_pool.submit(int) for _ in range(workers)]:
+            future.result()
+
+
+def _submit(fn, *args):
+    """Run a hashing call on the pool, returning a future"""
+    _slots.acquire()
+    future = _pool.submit(fn, *args)
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def hash_password(password):
+    """Hash a password at the configured cost"""
+    if _pool is None:
+        return _hash(password, _rounds)
+    return _submit(_hash, password, _rounds).result()
+
+
+def check_password(hashed, password):
+    """Check a password against a stored hash"""
+    if _pool is None:
+        return _check(password, hashed)
+    return _submit(_check, password, hashed).result()
+
+
+def needs_rehash(hashed):
+    """Whether a stored hash was made with a different cost than configured"""
+    try:
+        return int(hashed.split('$')[2]) != _rounds
+    except (IndexError, ValueError):
+        return True
+
+
+def rehash_in_background(password, on_hashed):
+    """Hash a password at the current cost off the request path and pass the result to ``on_hashed``"""
+    def done(future):
+        try:
+            on_hashed(future.result())
+        except Exception as e:
+            logging.error(f"Password rehash failed: {str(e)}")
+
+    if _pool is None:
+        try:
+            on_hashed(_hash(password, _rounds))
+        except Exception as e:
+            logging.error(f"Password rehash failed: {str(e)}")
+        return
+    _submit(_hash, password, _rounds).add_done_callback(done)
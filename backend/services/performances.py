@@ -0,0 +1,157 @@
+from extensions import mongo
+from services.scoring import STAT_FIELDS, derived_fields_pipeline
+from services.teams import SNAPSHOT_PROJECTION, refreshed_team, totals_stages
+from pymongo import ReturnDocument, UpdateMany
+from bson import ObjectId
+from collections import defaultdict
+from datetime import datetime, timezone
+import time
+
+# Rows accepted per ingest call
+MAX_BATCH_ROWS = 5000
+
+# Entries kept in each user's points_history; older ones are trimmed on push
+POINTS_HISTORY_LIMIT = 200
+
+TIMESERIES_OPTIONS = {'timeField': 'ts', 'metaField': 'meta', 'granularity': 'seconds'}
+
+
+def ensure_collection():
+    """Create the performances time-series collection if it does not exist yet.
+
+    Its index is in the registry of services/indexes.py.
+    """
+    if 'performances' not in mongo.db.list_collection_names():
+        mongo.db.create_collection('performances', timeseries=TIMESERIES_OPTIONS)
+
+
+def _number(value, field):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{field} must be a number")
+    return value
+
+
+def parse_rows(match_id, rows):
+    """Validate an ingest batch into time-series documents.
+
+    Each row names a ``player_id`` and carries stat deltas for any of the
+    STAT_FIELDS (overs as a decimal number of overs), so ball-by-ball and
+    per-innings feeds share one format. Raises ValueError on a bad row.
+    """
+    if not isinstance(match_id, str) or not match_id:
+        raise ValueError("match_id is required")
+    if not isinstance(rows, list) or not rows:
+        raise ValueError("rows must be a non-empty list")
+    if len(rows) > MAX_BATCH_ROWS:
+        raise ValueError(f"At most {MAX_BATCH_ROWS} rows per batch")
+
+    now = datetime.now(timezone.utc)
+    documents = []
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict) or not ObjectId.is_valid(row.get('player_id')):
+            raise ValueError(f"Row {i}: invalid player_id")
+        try:
+            ts = datetime.fromisoformat(row['ts']) if 'ts' in row else now
+            stats = {field: _number(row[field], field) for field in STAT_FIELDS if field in row}
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Row {i}: {e}")
+        documents.append({
+            'ts': ts,
+            'meta': {'player_id': ObjectId(row['player_id']), 'match_id': match_id},
+            **stats
+        })
+    return documents
+
+
+def _apply_to_player(player_id, deltas, match_id, now):
+    """Add stat deltas to a player's season totals and re-derive their points.
+
+    The whole update runs on the server, so concurrent batches for the same
+    player never lose increments. Returns the updated player's snapshot
+    fields and last_performance, or None if the player does not exist.
+    """
+    player = mongo.db.players.find_one_and_update(
+        {'_id': player_id},
+        [
+            {'$set': {
+                '_ledger_points': {'$ifNull': ['$points', 0]},
+                **{field: {'$add': [{'$ifNull': [f'${field}', 0]}, delta]} for field, delta in deltas.items()}
+            }},
+            *derived_fields_pipeline(),
+            {'$set': {'last_performance': {
+                'match_id': {'$literal': match_id},
+                'at': now,
+                'points_delta': {'$round': [{'$subtract': ['$points', '$_ledger_points']}, 2]}
+            }}},
+            {'$unset': '_ledger_points'}
+        ],
+        projection={**SNAPSHOT_PROJECTION, 'last_performance': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    return player
+
+
+def _team_update(player, match_id, now):
+    """Write a player's updated points into every team holding them and log the delta.
+
+    The snapshot gets the player's absolute points and the team totals are
+    recomputed from it, so a team sync or team add racing with the ingest
+    cannot get the delta counted twice. Only complete teams score.
+    """
+    player_id = str(player['_id'])
+    entry = {'match_id': match_id, 'player_id': player_id,
+             'points': player['last_performance']['points_delta'], 'at': now}
+    return UpdateMany({'team.player_id': player_id}, [
+        {'$set': {
+            'team': refreshed_team(player),
+            'points_history': {'$slice': [
+                {'$concatArrays': [{'$ifNull': ['$points_history', []]}, [{'$literal': entry}]]},
+                -POINTS_HISTORY_LIMIT
+            ]}
+        }},
+        *totals_stages()
+    ])
+
+
+def ingest_performances(match_id, rows):
+    """Append a batch of match performances and roll it into player and user totals.
+
+    Rows are coalesced per player first, so a batch costs one update per
+    distinct player, one bulk write for all affected users and one insert
+    into the ledger, however many balls it covers. Rows for unknown players
+    are dropped.
+    """
+    started = time.perf_counter()
+    documents = parse_rows(match_id, rows)
+    now = datetime.now(timezone.utc)
+
+    deltas = defaultdict(dict)
+    for document in documents:
+        player_deltas = deltas[document['meta']['player_id']]
+        for field in STAT_FIELDS:
+            if field in document:
+                player_deltas[field] = player_deltas.get(field, 0) + document[field]
+
+    points, requests, unknown = {}, [], set()
+    for player_id, player_deltas in deltas.items():
+        player = _apply_to_player(player_id, player_deltas, match_id, now)
+        if player is None:
+            unknown.add(player_id)
+            continue
+        points[player_id] = player['last_performance']['points_delta']
+        if points[player_id]:
+            requests.append(_team_update(player, match_id, now))
+    users_updated = mongo.db.users.bulk_write(requests, ordered=False).modified_count if requests else 0
+
+    recorded = [document for document in documents if document['meta']['player_id'] not in unknown]
+    if recorded:
+        mongo.db.performances.insert_many(recorded, ordered=False)
+
+    return {
+        'rows': len(recorded),
+        'players': len(points),
+        'unknown_players': [str(player_id) for player_id in unknown],
+        'users_updated': users_updated,
+        'points': {str(player_id): points_delta for player_id, points_delta in points.items()},
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
@@ -0,0 +1,257 @@
+from extensions import mongo
+from services import realtime
+from services.realtime import on_change
+from services.scoring import STAT_FIELDS, DERIVED_FIELDS
+import logging
+import threading
+import time
+import numpy as np
+
+# Columns held by the store; numeric ones are float64 with NaN for missing
+NUMERIC_FIELDS = STAT_FIELDS + DERIVED_FIELDS
+TEXT_FIELDS = ['Name', 'University', 'Category']
+
+INITIAL_CAPACITY = 1024
+
+
+class PlayerStore:
+    """Players as NumPy column arrays with an _id to row index.
+
+    Deleted players leave a dead row behind, so row numbers stay stable
+    and no column ever has to be compacted. Every access holds ``lock``;
+    queries are vectorized so they hold it only briefly.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY, version=0):
+        self.lock = threading.RLock()
+        self.version = version
+        self.loaded_at = None
+        self.size = 0
+        self.index = {}
+        self.ids = np.empty(capacity, dtype=object)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.numeric = {field: np.full(capacity, np.nan) for field in NUMERIC_FIELDS}
+        self.text = {field: np.empty(capacity, dtype=object) for field in TEXT_FIELDS}
+
+    def _grow(self):
+        capacity = 2 * len(self.ids)
+        self.ids = np.resize(self.ids, capacity)
+        self.live = np.concatenate([self.live, np.zeros(capacity - len(self.live), dtype=bool)])
+        for field, column in self.numeric.items():
+            self.numeric[field] = np.concatenate([column, np.full(capacity - len(column), np.nan)])
+        for field, column in self.text.items():
+            self.text[field] = np.concatenate([column, np.empty(capacity - len(column), dtype=object)])
+
+    def _row(self, player_id):
+        """Row of a player, appending a blank one for a new _id"""
+        row = self.index.get(player_id)
+        if row is None:
+            if self.size == len(self.ids):
+                self._grow()
+            row = self.index[player_id] = self.size
+            self.size += 1
+            self.ids[row] = player_id
+        return row
+
+    def _set(self, row, field, value):
+        if field in self.numeric:
+            is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            self.numeric[field][row] = value if is_number else np.nan
+        elif field in self.text:
+            self.text[field][row] = value
+
+    def upsert(self, player):
+        """Store a full player document, replacing any previous version"""
+        with self.lock:
+            row = self._row(player['_id'])
+            for field in NUMERIC_FIELDS + TEXT_FIELDS:
+                self._set(row, field, player.get(field))
+            self.live[row] = True
+            self.version += 1
+
+    def update(self, player_id, updated, removed=()):
+        """Apply a change event's updatedFields/removedFields to a stored player"""
+        with self.lock:
+            row = self.index.get(player_id)
+            if row is None:
+                return
+            for field, value in updated.items():
+                self._set(row, field, value)
+            for field in removed:
+                self._set(row, field, None)
+            self.version += 1
+
+    def delete(self, player_id):
+        with self.lock:
+            row = self.index.get(player_id)
+            if row is not None:
+                self.live[row] = False
+                self.version += 1
+
+    def apply_change(self, change):
+        """Bring the store in line with one players change event"""
+        operation = change['operationType']
+        if 'documentKey' not in change:
+            return
+        player_id = change['documentKey']['_id']
+        if operation in ('insert', 'replace') and 'fullDocument' in change:
+            self.upsert(change['fullDocument'])
+        elif operation == 'update':
+            description = change.get('updateDescription', {})
+            self.update(player_id, description.get('updatedFields', {}), description.get('removedFields', []))
+        elif operation == 'delete':
+            self.delete(player_id)
+
+    # Queries
+
+    def mask(self, category=None, university=None):
+        """Boolean row mask of live players, optionally filtered by Category/University"""
+        with self.lock:
+            mask = self.live[:self.size].copy()
+            if category is not None:
+                mask &= self.text['Category'][:self.size] == category
+            if university is not None:
+                mask &= self.text['University'][:self.size] == university
+            return mask
+
+    def column(self, field, mask=None):
+        """Values of a numeric column, for all live rows or those in ``mask``"""
+        with self.lock:
+            column = self.numeric[field][:self.size]
+            return column[self.live[:self.size] if mask is None else mask]
+
+    def groups(self, field):
+        """Live rows grouped by the value of a text column"""
+        with self.lock:
+            keys = self.text[field]
+            groups = {}
+            for row in np.flatnonzero(self.live[:self.size]):
+                groups.setdefault(keys[row], []).append(row)
+            return {key: np.array(rows) for key, rows in groups.items()}
+
+    def top(self, field, k, ascending=False, **filters):
+        """Rows of the ``k`` players with the highest (or lowest) ``field``.
+
+        Players without a value for ``field`` are skipped.
+        """
+        with self.lock:
+            mask = self.mask(**filters) & ~np.isnan(self.numeric[field][:self.size])
+            rows = np.flatnonzero(mask)
+            values = self.numeric[field][rows] * (1 if ascending else -1)
+            if k < len(rows):
+                keep = np.argpartition(values, k)[:k]
+                rows, values = rows[keep], values[keep]
+            return rows[np.argsort(values, kind='stable')]
+
+    def histogram(self, field, bins=10, **filters):
+        """Histogram of ``field`` over the matching players, as (counts, bin edges)"""
+        values = self.column(field, self.mask(**filters))
+        return np.histogram(values[~np.isnan(values)], bins=bins)
+
+    def records(self, rows, fields=None):
+        """Player dicts for the given rows; missing numeric values are left out"""
+        fields = fields or TEXT_FIELDS + NUMERIC_FIELDS
+        with self.lock:
+            records = []
+            for row in rows:
+                record = {'_id': self.ids[row]}
+                for field in fields:
+                    if field in self.numeric:
+                        value = self.numeric[field][row]
+                        if not np.isnan(value):
+                            record[field] = int(value) if value.is_integer() else float(value)
+                    else:
+                        record[field] = self.text[field][row]
+                records.append(record)
+            return records
+
+    def get(self, player_id, fields=None):
+        """A single live player as a dict, or None"""
+        with self.lock:
+            row = self.index.get(player_id)
+            if row is None or not self.live[row]:
+                return None
+            return self.records([row], fields)[0]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'players': int(self.live[:self.size].sum()),
+                'rows': self.size,
+                'version': self.version,
+                'loaded_at': self.loaded_at
+            }
+
+
+# Seconds a store is served while no players change stream keeps it current
+# (e.g. on a standalone mongod); older ones are reloaded on next use, so
+# writes from other processes such as `flask ingest-players` show up
+UNWATCHED_MAX_AGE = 30
+
+_store = None
+_store_lock = threading.Lock()
+# Versions carry on across reloads, so caches keyed on one never see a repeat
+_next_version = 0
+
+
+def _watched():
+    watcher = realtime.watchers.get('players')
+    return watcher is not None and watcher.status in ('running', 'standby')
+
+
+def _fresh(store):
+    return store is not None and (_watched() or time.time() - store.loaded_at < UNWATCHED_MAX_AGE)
+
+
+def _retire(store):
+    """Forget a store; the next one continues its version numbers"""
+    global _store, _next_version
+    if store is not None:
+        _next_version = max(_next_version, store.version + 1)
+    _store = None
+
+
+def get_store():
+    """Return the process-wide PlayerStore, loading it from Mongo on first use.
+
+    Change events arriving during the load wait for it and are applied on
+    top; they carry absolute field values, so replaying one the load
+    already saw is harmless. Without a running players change stream the
+    store is reloaded once it is UNWATCHED_MAX_AGE old.
+    """
+    global _store
+    store = _store
+    if _fresh(store):
+        return store
+    with _store_lock:
+        if _fresh(_store):
+            return _store
+        _retire(_store)
+        started = time.perf_counter()
+        store = PlayerStore(version=_next_version)
+        for player in mongo.db.players.find({}, {field: 1 for field in NUMERIC_FIELDS + TEXT_FIELDS}):
+            store.upsert(player)
+        store.loaded_at = time.time()
+        _store = store
+        logging.info(f"Loaded {store.size} players into the player store in "
+                     f"{round((time.perf_counter() - started) * 1000, 1)}ms")
+        return _store
+
+
+def reload_unless_watched():
+    """Drop the store after a write when no change stream will deliver it.
+
+    With the players stream running (or relayed from another worker) the
+    store catches up on its own; otherwise it is reloaded on next use.
+    """
+    if not _watched():
+        with _store_lock:
+            _retire(_store)
+
+
+@on_change('players')
+def _apply_player_change(change):
+    with _store_lock:
+        store = _store
+    if store is not None:
+        store.apply_change(change)
@@ -0,0 +1,101 @@
+from services.scoring import STAT_FIELDS, DERIVED_FIELDS, derived_fields_pipeline, score_player
+from bson import ObjectId
+import math
+
+TEXT_FIELDS = ['Name', 'University', 'Category']
+CATEGORIES = ['Batsman', 'Bowler', 'All-Rounder']
+
+# Stats counted in whole units; Overs_Bowled may be fractional
+INTEGER_STATS = {'Total_Runs', 'Balls_Faced', 'Innings_Played', 'Wickets', 'Runs_Conceded'}
+
+# Updates accepted by one bulk request
+MAX_BULK_UPDATES = 1000
+
+
+def _coerce_stat(field, value):
+    """Coerce a stat from JSON (number or numeric string) to a non-negative number"""
+    if isinstance(value, bool):
+        raise ValueError(f"{field} must be a number")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number")
+    if not math.isfinite(number) or number < 0:
+        raise ValueError(f"{field} must be a non-negative number")
+    if field in INTEGER_STATS:
+        if not number.is_integer():
+            raise ValueError(f"{field} must be a whole number")
+        return int(number)
+    return number
+
+
+def validate_player(data, partial=False):
+    """Validate and coerce the editable fields of a player.
+
+    Derived fields are rejected, since they are always computed from the
+    stats. With ``partial=True`` only the given fields are checked, as for
+    an update. Raises ValueError on bad input.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Player data must be an object")
+    unknown = [field for field in data if field not in TEXT_FIELDS and field not in STAT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown or read-only fields: {', '.join(unknown)}")
+    if not partial and any(field not in data for field in TEXT_FIELDS + STAT_FIELDS):
+        raise ValueError("Missing required fields")
+    if not data:
+        raise ValueError("No fields to update")
+
+    player = {}
+    for field, value in data.items():
+        if field in TEXT_FIELDS:
+            if not isinstance(value, str) or not value.strip():
+                raise ValueError(f"{field} must be a non-empty string")
+            player[field] = value.strip()
+        else:
+            player[field] = _coerce_stat(field, value)
+
+    if 'Category' in player and player['Category'] not in CATEGORIES:
+        raise ValueError(f"Category must be one of {', '.join(CATEGORIES)}")
+    return player
+
+
+def new_player(data):
+    """Validated player document with its derived fields filled in"""
+    player = validate_player(data)
+    return {**player, **score_player(player)}
+
+
+def update_pipeline(fields):
+    """Update pipeline that sets ``fields`` and recomputes the derived stats in the same write"""
+    return [{'$set': {field: {'$literal': value} for field, value in fields.items()}},
+            *derived_fields_pipeline()]
+
+
+def parse_bulk_updates(updates):
+    """Validate a bulk update body into (ObjectId, fields) pairs.
+
+    Each entry is a player ``_id`` plus the fields to change.
+    """
+    if not isinstance(updates, list) or not updates:
+        raise ValueError("updates must be a non-empty list")
+    if len(updates) > MAX_BULK_UPDATES:
+        raise ValueError(f"At most {MAX_BULK_UPDATES} updates per request")
+
+    parsed = []
+    for i, update in enumerate(updates):
+        if not isinstance(update, dict) or not ObjectId.is_valid(update.get('_id')):
+            raise ValueError(f"Update {i}: invalid _id")
+        fields = {field: value for field, value in update.items() if field != '_id'}
+        try:
+            parsed.append((ObjectId(update['_id']), validate_player(fields, partial=True)))
+        except ValueError as e:
+            raise ValueError(f"Update {i}: {e}")
+    return parsed
+
+
+def stored_stats(player):
+    """Derived stats of a player document, computing them only if they were never stored"""
+    if all(field in player for field in DERIVED_FIELDS):
+        return {field: player[field] for field in DERIVED_FIELDS}
+    return score_player(player)
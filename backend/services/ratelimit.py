@@ -0,0 +1,89 @@
+from flask import jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+import math
+import threading
+import time
+
+# Buckets kept before idle (full) ones are pruned
+MAX_BUCKETS = 100000
+
+# Unauthenticated endpoints left unlimited: they could only be keyed on the
+# client address, which behind a load balancer is the balancer's for every
+# client, so the login spike at match start would share one bucket
+EXEMPT_ENDPOINTS = ('user.login', 'user.signup')
+
+
+class TokenBucketLimiter:
+    """Token bucket per key: ``rate`` requests/second sustained, bursts of up to ``burst``"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.pruned_at = 0
+        self.lock = threading.Lock()
+        self.stats = {'allowed': 0, 'limited': 0}
+
+    def acquire(self, key):
+        """Take a token for ``key``; return 0 if granted, else seconds until one is available"""
+        now = time.monotonic()
+        with self.lock:
+            if len(self.buckets) > MAX_BUCKETS and now - self.pruned_at > self.burst / self.rate:
+                self._prune(now)
+            tokens, updated = self.buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self.buckets[key] = (tokens - 1, now)
+                self.stats['allowed'] += 1
+                return 0
+            self.buckets[key] = (tokens, now)
+            self.stats['limited'] += 1
+            return (1 - tokens) / self.rate
+
+    def _prune(self, now):
+        """Forget buckets that have refilled completely; they behave like new ones"""
+        refill = self.burst / self.rate
+        self.buckets = {key: (tokens, updated) for key, (tokens, updated) in self.buckets.items()
+                        if now - updated < refill}
+        self.pruned_at = now
+
+
+_limiter = None
+
+
+def client_key():
+    """Rate limit key of the current request: the JWT identity, else the client address"""
+    try:
+        if verify_jwt_in_request(optional=True):
+            return f"user:{get_jwt_identity()}"
+    except Exception:
+        pass  # invalid or expired tokens are rejected by the route itself
+    return f"ip:{request.remote_addr}"
+
+
+def limit_request():
+    """before_request hook: answer 429 with Retry-After once a client's bucket is empty"""
+    if _limiter is None or request.endpoint in EXEMPT_ENDPOINTS:
+        return None
+    retry_after = _limiter.acquire(client_key())
+    if retry_after:
+        response = jsonify({"msg": "Too many requests"})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        return response
+    return None
+
+
+def stats():
+    if _limiter is None:
+        return {'enabled': False}
+    with _limiter.lock:
+        return {'enabled': True, 'rate': _limiter.rate, 'burst': _limiter.burst,
+                'clients': len(_limiter.buckets), **_limiter.stats}
+
+
+def init_rate_limit(app):
+    """Enable per-client limiting from RATE_LIMIT_PER_SEC/RATE_LIMIT_BURST; a rate of 0 disables it"""
+    global _limiter
+    rate = app.config.get('RATE_LIMIT_PER_SEC', 0)
+    _limiter = TokenBucketLimiter(rate, max(1, app.config.get('RATE_LIMIT_BURST', rate))) if rate > 0 else None
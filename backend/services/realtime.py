@@ -1,37 +1,371 @@
 from flask import request
-from flask_socketio import SocketIO, emit, join_room
+from flask_socketio import emit, join_room
 from bson import ObjectId, json_util
 from services.database import mongo
-import json
+from extensions import socketio
+from services.leader import Lease
+from services.metrics import record_emit
+from services import json_codec
+from pymongo.errors import OperationFailure, PyMongoError
+from collections import defaultdict
+from datetime import datetime, timezone
 import logging
+import threading
+import time
 
-socketio = SocketIO(None, cors_allowed_origins="http://localhost:3000", logger=True, engineio_logger=True)
+# Seconds change events are coalesced before a batch is emitted
+BATCH_WINDOW = 0.25
 
-def serialize(data):
-    """Serialize MongoDB documents to JSON"""
-    return json.loads(json_util.dumps(data))
+# Backoff between change stream restarts, in seconds
+WATCH_BACKOFF_INITIAL = 0.5
+WATCH_BACKOFF_MAX = 30
 
-def watch_collection(collection_name, event_name):
-    """Watch MongoDB collection changes and emit Socket.IO events"""
-    try:
-        with mongo.db[collection_name].watch(
-            full_document='updateLookup',
-            max_await_time_ms=1000
+# Seconds between checkpoints of an idle stream; a busy stream checkpoints
+# after every batch. Idle checkpoints keep the stored resume token inside
+# the oplog window.
+IDLE_CHECKPOINT_INTERVAL = 60
+
+# Internal event carrying change events from a stream leader to other workers;
+# it is emitted to a room no client can join
+RELAY_EVENT = 'realtime:change_relay'
+RELAY_ROOM = 'realtime:relay'
+
+# Set by init_realtime when workers share a message queue: each change stream
+# is then consumed by a single elected worker
+MULTI_WORKER = False
+
+# Server errors meaning a stored resume token can no longer be used
+# (InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost)
+RESUME_TOKEN_LOST_CODES = (260, 280, 286)
+
+# Fields never sent to clients, per collection; any socket can join a
+# collection's room
+HIDDEN_FIELDS = {'users': ('password',)}
+
+# In-process callbacks run for every change event, keyed by collection name
+_change_listeners = defaultdict(list)
+
+def on_change(collection_name, leader_only=False):
+    """Register a function to be called with each change event on a collection.
+
+    In multi-worker mode change events are relayed to every worker, so
+    listeners maintaining process-local state see all of them. Listeners
+    with side effects that must happen once (database writes) should pass
+    ``leader_only=True`` to run only in the worker consuming the stream.
+    """
+    def decorator(listener):
+        _change_listeners[collection_name].append((listener, leader_only))
+        return listener
+    return decorator
+
+def notify_listeners(collection_name, change, relayed=False):
+    """Run the registered listeners for a change event, isolating their failures"""
+    for listener, leader_only in _change_listeners[collection_name]:
+        if relayed and leader_only:
+            continue
+        try:
+            listener(change)
+        except Exception as e:
+            logging.error(f"Change listener {listener.__name__} failed for {collection_name}: {str(e)}")
+
+def relay_manager(url):
+    """Socket.IO message-queue client manager that also relays change events.
+
+    Every worker fans emits out to its own sockets from the queue. The
+    worker leading a change stream additionally publishes the raw events
+    under RELAY_EVENT, which the other workers hand to their local
+    listeners instead of emitting to clients. Returns None without a URL.
+    """
+    if not url:
+        return None
+    if url.startswith(('redis://', 'rediss://')):
+        from socketio import RedisManager as QueueManager
+    elif url.startswith('kafka://'):
+        from socketio import KafkaManager as QueueManager
+    else:
+        from socketio import KombuManager as QueueManager
+
+    class ChangeRelayManager(QueueManager):
+        def _handle_emit(self, message):
+            if message.get('event') != RELAY_EVENT:
+                return super()._handle_emit(message)
+            if message.get('host_id') == self.host_id:
+                return  # the leader already ran its own listeners
+            payload = message['data'][0]
+            for change in json_util.loads(payload['changes']):
+                notify_listeners(payload['collection'], change, relayed=True)
+
+    return ChangeRelayManager(url, channel='flask-socketio')
+
+class SocketJSON:
+    """JSON module for Socket.IO packets: the app-wide encoder plus emit metrics.
+
+    Every packet is encoded once per emit, whatever the room size, so
+    this is also where emit counts and sizes are recorded.
+    """
+
+    @staticmethod
+    def dumps(data, **kwargs):
+        encoded = json_codec.dumps(data)
+        if isinstance(data, list) and data and isinstance(data[0], str):
+            record_emit(data[0], len(encoded))
+        return encoded
+
+    loads = staticmethod(json_codec.loads)
+
+def _set_path(doc, path, value):
+    """Apply a dotted updatedFields path to a document"""
+    *parents, leaf = path.split('.')
+    for key in parents:
+        doc = doc.setdefault(key, {}) if isinstance(doc, dict) else doc[int(key)]
+    if isinstance(doc, dict):
+        doc[leaf] = value
+    elif int(leaf) == len(doc):
+        doc.append(value)
+    else:
+        doc[int(leaf)] = value
+
+def change_delta(change, hidden=()):
+    """Reduce a change event to the compact delta sent to clients, leaving out ``hidden`` fields"""
+    doc_id = str(change['documentKey']['_id'])
+    delta = {'_id': doc_id, 'operation': change['operationType']}
+    if change['operationType'] in ('insert', 'replace'):
+        delta['data'] = {key: value for key, value in change.get('fullDocument', {}).items() if key not in hidden}
+        delta['data']['_id'] = doc_id
+    elif change['operationType'] == 'update':
+        description = change.get('updateDescription', {})
+        delta['updated'] = {path: value for path, value in description.get('updatedFields', {}).items()
+                            if path.split('.')[0] not in hidden}
+        delta['removed'] = [path for path in description.get('removedFields', [])
+                            if path.split('.')[0] not in hidden]
+    return delta
+
+def merge_deltas(previous, current):
+    """Coalesce two consecutive deltas for the same document into one"""
+    if current['operation'] != 'update' or previous['operation'] == 'delete':
+        return current
+    if previous['operation'] in ('insert', 'replace'):
+        # Fold the update into the full document the client has not seen yet
+        for field in current['removed']:
+            previous['data'].pop(field, None)
+        for path, value in current['updated'].items():
+            _set_path(previous['data'], path, value)
+        return previous
+    for field in current['removed']:
+        previous['updated'].pop(field, None)
+    previous['removed'] = [f for f in previous['removed'] if f not in current['updated']] + \
+        [f for f in current['removed'] if f not in previous['removed']]
+    previous['updated'].update(current['updated'])
+    return previous
+
+class ChangeBatcher:
+    """Coalesce change events per document and emit them as one batch per window.
+
+    Batches go only to the collection's subscription room and are encoded
+    once by SocketJSON, however many clients are in the room.
+    """
+
+    def __init__(self, event_name, room, window=None, hidden=()):
+        self.event_name = event_name
+        self.room = room
+        self.hidden = hidden
+        self.window = window if window is not None else BATCH_WINDOW
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def add(self, change):
+        if 'documentKey' not in change:
+            return  # drop/rename/invalidate events carry no document
+        delta = change_delta(change, self.hidden)
+        if delta['operation'] == 'update' and not delta['updated'] and not delta['removed']:
+            return  # only hidden fields changed
+        with self.lock:
+            previous = self.pending.get(delta['_id'])
+            self.pending[delta['_id']] = delta if previous is None else merge_deltas(previous, delta)
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = list(self.pending.values()), {}
+        if not batch:
+            return
+        socketio.emit(self.event_name, {'operation': 'batch', 'changes': batch}, to=self.room)
+        logging.debug(f"Emitted {self.event_name} batch of {len(batch)} changes to {self.room}")
+
+    def __len__(self):
+        with self.lock:
+            return len(self.pending)
+
+class ChangeWatcher:
+    """Supervised change stream consumer for one collection.
+
+    The resume token of the last emitted batch is checkpointed to the
+    stream_checkpoints collection, so the stream resumes where it left off
+    after an error or a process restart. Failures are retried with
+    exponential backoff instead of ending realtime updates.
+    """
+
+    def __init__(self, collection_name, event_name, lease=None):
+        self.collection_name = collection_name
+        self.batcher = ChangeBatcher(event_name, f'{collection_name}_updates',
+                                     hidden=HIDDEN_FIELDS.get(collection_name, ()))
+        self.lease = lease
+        self._relay = []
+        self.running = True
+        self.status = 'starting'
+        self.events = 0
+        self.restarts = 0
+        self.events_per_sec = 0.0
+        self.lag_ms = None
+        self.last_error = None
+        self.last_event_at = None
+        self._saved_token = None
+        self._saved_at = time.monotonic()
+        self._pending_since = None
+
+    def _load_token(self):
+        checkpoint = mongo.db.stream_checkpoints.find_one({'_id': self.collection_name})
+        return checkpoint['token'] if checkpoint else None
+
+    def _save_token(self, token):
+        if token is None or token == self._saved_token:
+            return
+        mongo.db.stream_checkpoints.update_one(
+            {'_id': self.collection_name},
+            {'$set': {'token': token, 'updated_at': datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        self._saved_token = token
+        self._saved_at = time.monotonic()
+
+    def _clear_token(self):
+        mongo.db.stream_checkpoints.delete_one({'_id': self.collection_name})
+        self._saved_token = None
+
+    def _flush(self, token, period):
+        """Emit the pending batch, record its lag and checkpoint the stream.
+
+        The post-batch resume token advances even when no event arrived, so
+        an idle stream is only checkpointed every IDLE_CHECKPOINT_INTERVAL.
+        """
+        emitted = len(self.batcher)
+        received = self._pending_since is not None
+        self.batcher.flush()
+        if self._relay:
+            changes, self._relay = self._relay, []
+            # Extended JSON keeps the BSON types listeners rely on
+            socketio.emit(RELAY_EVENT, {
+                'collection': self.collection_name,
+                'changes': json_util.dumps(changes)
+            }, to=RELAY_ROOM)
+        if self._pending_since is not None:
+            self.lag_ms = round((time.time() - self._pending_since) * 1000, 1)
+            self._pending_since = None
+        rate = emitted / period if period else 0
+        self.events_per_sec = round(0.8 * self.events_per_sec + 0.2 * rate, 2)
+        if received or time.monotonic() - self._saved_at >= IDLE_CHECKPOINT_INTERVAL:
+            self._save_token(token)
+
+    def _consume(self):
+        window = self.batcher.window
+        token = self._load_token()
+        with mongo.db[self.collection_name].watch(
+            resume_after=token,
+            max_await_time_ms=max(1, int(window * 1000))
         ) as stream:
-            logging.info(f"Watching {collection_name} collection for changes...")
-            for change in stream:
-                doc = change.get('fullDocument', {})
-                doc['_id'] = str(doc['_id']) if '_id' in doc else None
-                
-                socketio.emit(event_name, {
-                    'operation': change['operationType'],
-                    'data': serialize(doc),
-                    'change_id': str(change['_id'])
-                })
-                logging.debug(f"Emitted {event_name} event for {change['operationType']}")
-    except Exception as e:
-        logging.error(f"Change stream error for {collection_name}: {str(e)}")
-        socketio.emit('error', {'message': f"Change stream error: {str(e)}"})
+            logging.info(f"Watching {self.collection_name} collection for changes"
+                         f"{' (resumed)' if token else ''}...")
+            self.status = 'running'
+            last_flush = time.monotonic()
+            while self.running and stream.alive:
+                if self.lease and not self.lease.renew_if_due():
+                    logging.warning(f"Lost the {self.collection_name} stream lease to another worker")
+                    break
+                change = stream.try_next()
+                if change is not None:
+                    self._record(change)
+                    notify_listeners(self.collection_name, change)
+                    self.batcher.add(change)
+                    if MULTI_WORKER:
+                        self._relay.append(change)
+                now = time.monotonic()
+                if now - last_flush >= window:
+                    self._flush(stream.resume_token, now - last_flush)
+                    last_flush = now
+                socketio.sleep(0)
+            self._flush(stream.resume_token, time.monotonic() - last_flush)
+
+    def _record(self, change):
+        self.events += 1
+        self.last_event_at = time.time()
+        # wallTime (MongoDB 6+) has millisecond precision, clusterTime only seconds
+        wall_time = change.get('wallTime')
+        if wall_time is not None:
+            event_time = wall_time.replace(tzinfo=timezone.utc).timestamp()
+        else:
+            event_time = change['clusterTime'].time
+        if self._pending_since is None:
+            self._pending_since = event_time
+
+    def run(self):
+        """Consume the change stream until stopped, restarting it on failure"""
+        delay = WATCH_BACKOFF_INITIAL
+        while self.running:
+            if self.lease and not self.lease.acquire():
+                # Another worker consumes this stream; stand by to take over
+                self.status = 'standby'
+                socketio.sleep(self.lease.renew_interval)
+                continue
+            try:
+                self._consume()
+                delay = WATCH_BACKOFF_INITIAL
+            except OperationFailure as e:
+                if e.code in RESUME_TOKEN_LOST_CODES:
+                    logging.warning(f"Resume token for {self.collection_name} is no longer valid; "
+                                    f"changes since the last checkpoint were missed")
+                    self._clear_token()
+                self._failed(e)
+            except PyMongoError as e:
+                self._failed(e)
+            except Exception as e:
+                logging.exception(f"Unexpected change stream error for {self.collection_name}")
+                self._failed(e)
+            if self.running and self.status == 'backoff':
+                socketio.sleep(delay)
+                delay = min(delay * 2, WATCH_BACKOFF_MAX)
+        self.status = 'stopped'
+
+    def _failed(self, error):
+        if self.status == 'running':
+            socketio.emit('error', {'message': f"Change stream error: {str(error)}"})
+        self.status = 'backoff'
+        self.restarts += 1
+        self.last_error = str(error)
+        logging.error(f"Change stream error for {self.collection_name}: {str(error)}")
+
+    def stop(self):
+        self.running = False
+        if self.lease:
+            self.lease.release()
+
+    def health(self):
+        return {
+            'status': self.status,
+            'events': self.events,
+            'events_per_sec': self.events_per_sec,
+            'lag_ms': self.lag_ms,
+            'restarts': self.restarts,
+            'last_error': self.last_error,
+            'last_event_at': self.last_event_at
+        }
+
+# Running watchers keyed by collection name
+watchers = {}
+
+def watch_collection(collection_name, event_name):
+    """Watch MongoDB collection changes and emit batched Socket.IO events"""
+    lease = Lease(f'watch:{collection_name}') if MULTI_WORKER else None
+    watcher = watchers[collection_name] = ChangeWatcher(collection_name, event_name, lease)
+    watcher.run()
 
 def watch_players():
     """Watch players collection changes"""
@@ -41,6 +375,14 @@ def watch_users():
     """Watch users collection changes"""
     watch_collection('users', 'user_update')
 
+def watcher_health():
+    """Report the state and lag of every change stream watcher"""
+    report = {name: watcher.health() for name, watcher in watchers.items()}
+    return {
+        'healthy': bool(report) and all(w['status'] in ('running', 'standby') for w in report.values()),
+        'watchers': report
+    }
+
 @socketio.on('connect')
 def handle_connect():
     """Handle new client connections"""
@@ -70,8 +412,9 @@ def handle_subscribe(data):
 
 def init_realtime(app):
     """Initialize real-time services"""
-    global socketio
-    socketio.init_app(app)  # 🔥 This ensures socketio is linked to Flask
+    global BATCH_WINDOW, MULTI_WORKER
+    BATCH_WINDOW = app.config.get('REALTIME_BATCH_WINDOW', BATCH_WINDOW)
+    MULTI_WORKER = bool(app.config.get('SOCKETIO_MESSAGE_QUEUE'))
     
     with app.app_context():
         # Start change stream watchers
@@ -0,0 +1,138 @@
+import numpy as np
+
+# Raw season stats every player carries, in the order score_arrays() expects them
+STAT_FIELDS = ['Total_Runs', 'Balls_Faced', 'Innings_Played',
+               'Wickets', 'Overs_Bowled', 'Runs_Conceded']
+
+# Fields derived from the raw stats and stored on each player document
+DERIVED_FIELDS = ['batting_sr', 'batting_avg', 'bowling_sr', 'economy', 'points', 'value']
+
+VALUE_STEP = 50000
+
+
+def _safe_divide(numerator, denominator):
+    """Element-wise division that yields 0 wherever the denominator is 0"""
+    out = np.zeros(np.broadcast(numerator, denominator).shape, dtype=float)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+def _as_column(values):
+    """Coerce a column of raw stats to floats, treating missing values as 0"""
+    return np.nan_to_num(np.asarray(values, dtype=float))
+
+
+def player_value(points):
+    """Player value for the given points, rounded to the nearest VALUE_STEP.
+
+    Works on scalars and NumPy arrays alike.
+    """
+    value = np.round((9 * np.asarray(points, dtype=float) + 100) * 1000 / VALUE_STEP) * VALUE_STEP
+    if value.ndim == 0:
+        return int(value)
+    return value.astype(np.int64)
+
+
+def score_arrays(total_runs, balls_faced, innings_played, wickets, overs_bowled, runs_conceded):
+    """Compute the unrounded derived stats for whole columns in one vectorized pass"""
+    total_runs = _as_column(total_runs)
+    balls_faced = _as_column(balls_faced)
+    innings_played = _as_column(innings_played)
+    wickets = _as_column(wickets)
+    overs_bowled = _as_column(overs_bowled)
+    runs_conceded = _as_column(runs_conceded)
+
+    # Batting calculations
+    batting_sr = _safe_divide(total_runs, balls_faced) * 100
+    batting_avg = _safe_divide(total_runs, innings_played)
+
+    # Bowling calculations
+    balls_bowled = overs_bowled * 6
+    bowling_sr = _safe_divide(balls_bowled, wickets)
+    economy = _safe_divide(runs_conceded, balls_bowled) * 6
+
+    # Points and value
+    points = (batting_sr / 5) + (batting_avg * 0.8) + \
+        _safe_divide(500, batting_sr) + _safe_divide(140, economy)
+
+    return {
+        'batting_sr': batting_sr,
+        'batting_avg': batting_avg,
+        'bowling_sr': bowling_sr,
+        'economy': economy,
+        'points': points,
+        'value': player_value(points)
+    }
+
+
+def score_frame(df):
+    """Return a copy of ``df`` with the derived stat columns added.
+
+    ``df`` must carry the STAT_FIELDS columns; ratios are rounded to two
+    decimals the same way they are stored on player documents.
+    """
+    derived = score_arrays(*(df[field].to_numpy() for field in STAT_FIELDS))
+    scored = df.copy()
+    for field in DERIVED_FIELDS:
+        scored[field] = derived[field] if field == 'value' else np.round(derived[field], 2)
+    return scored
+
+
+def score_player(player):
+    """Compute the rounded derived stats for a single player document"""
+    derived = score_arrays(*([player.get(field) or 0] for field in STAT_FIELDS))
+    scored = {field: round(float(derived[field][0]), 2) for field in DERIVED_FIELDS}
+    scored['value'] = int(derived['value'][0])
+    return scored
+
+
+
+def _safe_divide_expr(numerator, denominator):
+    """Aggregation expression for division that yields 0 when the denominator is 0"""
+    return {'$cond': [{'$eq': [denominator, 0]}, 0, {'$divide': [numerator, denominator]}]}
+
+
+def value_expr(points):
+    """Aggregation expression equivalent of player_value().
+
+    $round keeps the double type, so the result is converted to a long to
+    store an integer like player_value() does; budgets derived from it
+    stay integers too.
+    """
+    return {'$toLong': {'$multiply': [
+        {'$round': [{'$divide': [{'$add': [{'$multiply': [9, points]}, 100]}, VALUE_STEP / 1000]}, 0]},
+        VALUE_STEP
+    ]}}
+
+
+def derived_fields_pipeline():
+    """Update pipeline that recomputes every derived field on the server.
+
+    Mirrors score_arrays() so derived stats can be refreshed in place with
+    ``update_one``/``update_many`` instead of a read-modify-write.
+    """
+    stat = {field: {'$ifNull': [f'${field}', 0]} for field in STAT_FIELDS}
+    return [
+        {'$set': {
+            '_scoring.batting_sr': {'$multiply': [_safe_divide_expr(stat['Total_Runs'], stat['Balls_Faced']), 100]},
+            '_scoring.batting_avg': _safe_divide_expr(stat['Total_Runs'], stat['Innings_Played']),
+            '_scoring.balls_bowled': {'$multiply': [stat['Overs_Bowled'], 6]}
+        }},
+        {'$set': {
+            '_scoring.bowling_sr': _safe_divide_expr('$_scoring.balls_bowled', stat['Wickets']),
+            '_scoring.economy': {'$multiply': [_safe_divide_expr(stat['Runs_Conceded'], '$_scoring.balls_bowled'), 6]}
+        }},
+        {'$set': {
+            '_scoring.points': {'$add': [
+                {'$divide': ['$_scoring.batting_sr', 5]},
+                {'$multiply': ['$_scoring.batting_avg', 0.8]},
+                _safe_divide_expr(500, '$_scoring.batting_sr'),
+                _safe_divide_expr(140, '$_scoring.economy')
+            ]}
+        }},
+        {'$set': {
+            **{field: {'$round': [f'$_scoring.{field}', 2]} for field in DERIVED_FIELDS if field != 'value'},
+            'value': value_expr('$_scoring.points')
+        }},
+        {'$unset': '_scoring'}
+    ]
@@ -0,0 +1,49 @@
+from services.player_store import get_store
+import numpy as np
+
+
+def _total(values):
+    """Sum of a stat column, skipping players without it"""
+    total = float(np.nansum(values))
+    return int(total) if total.is_integer() else total
+
+
+def _top(store, field, label):
+    """The player with the highest ``field``, or None"""
+    rows = store.top(field, 1)
+    if not len(rows):
+        return None
+    player = store.records(rows, ['Name', 'University', field])[0]
+    return {'name': player['Name'], label: player[field], 'university': player['University']}
+
+
+def _breakdown(store, key, label):
+    """Per-group player counts, run and wicket totals and average points"""
+    rows = []
+    groups = store.groups(key)
+    for value in sorted(groups, key=lambda group: (group is not None, group)):
+        members = groups[value]
+        points = store.numeric['points'][members]
+        points = points[~np.isnan(points)]
+        rows.append({
+            label: value,
+            'players': len(members),
+            'total_runs': _total(store.numeric['Total_Runs'][members]),
+            'total_wickets': _total(store.numeric['Wickets'][members]),
+            'average_points': round(float(points.mean()), 2) if len(points) else None
+        })
+    return rows
+
+
+def get_summary():
+    """Tournament totals, leaders and per-University/Category breakdowns, served from the player store"""
+    store = get_store()
+    with store.lock:
+        return {
+            'total_runs': _total(store.column('Total_Runs')),
+            'total_wickets': _total(store.column('Wickets')),
+            'top_scorer': _top(store, 'Total_Runs', 'runs'),
+            'top_wicket_taker': _top(store, 'Wickets', 'wickets'),
+            'by_university': _breakdown(store, 'University', 'university'),
+            'by_category': _breakdown(store, 'Category', 'category')
+        }
@@ -0,0 +1,162 @@
+from extensions import mongo
+from services.realtime import on_change
+from flask.cli import with_appcontext
+from pymongo import UpdateOne
+from bson import ObjectId
+import click
+import logging
+import time
+
+TEAM_SIZE = 11
+
+# Player fields copied into each user's team so team views need no lookup;
+# "value" is what the user paid and stays fixed once the player is picked
+SNAPSHOT_FIELDS = ("Name", "University", "Category", "points")
+SNAPSHOT_PROJECTION = {field: 1 for field in SNAPSHOT_FIELDS + ("value",)}
+
+# Snapshot fields shown to users; player points stay hidden, as in the catalog
+PUBLIC_FIELDS = ("player_id", "Name", "University", "Category", "value")
+
+
+def team_entry(player):
+    """Snapshot of a player document as stored in a user's team"""
+    entry = {"player_id": str(player["_id"]), "value": player.get("value", 0)}
+    entry.update({field: player.get(field) for field in SNAPSHOT_FIELDS})
+    entry["points"] = entry["points"] or 0
+    return entry
+
+
+def public_entry(entry):
+    """A team snapshot entry without the fields hidden from users"""
+    return {field: entry.get(field) for field in PUBLIC_FIELDS}
+
+
+def totals_stages():
+    """Update pipeline stages recomputing a user's team aggregates from the snapshot.
+
+    Only complete teams score, so total_points stays 0 until the last pick.
+    """
+    return [
+        {"$set": {
+            "team_value": {"$sum": "$team.value"},
+            "team_points": {"$round": [{"$sum": "$team.points"}, 2]}
+        }},
+        {"$set": {
+            "total_points": {"$cond": [{"$eq": [{"$size": "$team"}, TEAM_SIZE]}, "$team_points", 0]}
+        }}
+    ]
+
+
+def refreshed_team(player):
+    """$set expression replacing a player's snapshot fields in ``$team`` with their current ones.
+
+    Writes absolute values, so it is safe to repeat or to race with other
+    snapshot writes; what each user paid is kept.
+    """
+    entry = team_entry(player)
+    refreshed = {"player_id": "$$this.player_id", "value": "$$this.value",
+                 **{field: {"$literal": entry[field]} for field in SNAPSHOT_FIELDS}}
+    return {"$map": {
+        "input": "$team",
+        "in": {"$cond": [{"$eq": ["$$this.player_id", {"$literal": entry["player_id"]}]}, refreshed, "$$this"]}
+    }}
+
+
+def apply_player_change(player_id):
+    """Push a player's current snapshot fields into every team holding them.
+
+    A deleted player is dropped from those teams and their price refunded.
+    Returns the number of users updated.
+    """
+    player = mongo.db.players.find_one({"_id": ObjectId(player_id)}, SNAPSHOT_PROJECTION)
+
+    if player is None:
+        is_player = {"$eq": ["$$this.player_id", {"$literal": str(player_id)}]}
+        not_player = {"$ne": ["$$this.player_id", {"$literal": str(player_id)}]}
+        team_update = {
+            "budget": {"$add": ["$budget", {"$sum": {"$map": {
+                "input": {"$filter": {"input": "$team", "cond": is_player}},
+                "in": "$$this.value"
+            }}}]},
+            "team": {"$filter": {"input": "$team", "cond": not_player}}
+        }
+    else:
+        team_update = {"team": refreshed_team(player)}
+
+    result = mongo.db.users.update_many(
+        {"team.player_id": str(player_id)},
+        [{"$set": team_update}, *totals_stages()]
+    )
+    return result.modified_count
+
+
+@on_change('players', leader_only=True)
+def _sync_team_snapshots(change):
+    """Keep team snapshots current as player documents change"""
+    operation = change['operationType']
+    if operation == 'insert' or 'documentKey' not in change:
+        return
+    if operation == 'update':
+        description = change.get('updateDescription', {})
+        touched = list(description.get('updatedFields', {})) + description.get('removedFields', [])
+        if not any(field.split('.')[0] in SNAPSHOT_FIELDS for field in touched):
+            return
+        if any(field.split('.')[0] == 'last_performance' for field in description.get('updatedFields', {})):
+            # Match ingest writes these points into the teams itself; after a
+            # player's first match the change reports last_performance.* paths
+            return
+
+    player_id = change['documentKey']['_id']
+    updated = apply_player_change(player_id)
+    logging.debug(f"Synced player {player_id} into {updated} team snapshots")
+
+
+def refresh_team_snapshots(rebuild=False):
+    """Rebuild team snapshots from the players collection.
+
+    By default only users predating the snapshot (no ``team_points``) are
+    migrated; ``rebuild=True`` resyncs everyone, e.g. after the change
+    stream was down. Players deleted meanwhile are dropped and refunded.
+    """
+    started = time.perf_counter()
+    query = {"team": {"$exists": True}}
+    if not rebuild:
+        query["team_points"] = {"$exists": False}
+    users = list(mongo.db.users.find(query, {"team": 1}))
+
+    player_ids = {ObjectId(p["player_id"]) for user in users for p in user.get("team", [])}
+    players = {
+        str(player["_id"]): player
+        for player in mongo.db.players.find({"_id": {"$in": list(player_ids)}}, SNAPSHOT_PROJECTION)
+    }
+
+    requests = []
+    for user in users:
+        team, refund = [], 0
+        for picked in user.get("team", []):
+            player = players.get(picked["player_id"])
+            if player is None:
+                refund += picked["value"]
+            else:
+                team.append({**team_entry(player), "value": picked["value"]})
+        requests.append(UpdateOne({"_id": user["_id"]}, [
+            {"$set": {"team": {"$literal": team}, "budget": {"$add": ["$budget", refund]}}},
+            *totals_stages()
+        ]))
+
+    modified = mongo.db.users.bulk_write(requests, ordered=False).modified_count if requests else 0
+    return {
+        'matched': len(users),
+        'modified': modified,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+@click.command('refresh-teams')
+@click.option('--all', 'rebuild', is_flag=True,
+              help='Resync every team, not just users without a snapshot.')
+@with_appcontext
+def refresh_teams_command(rebuild):
+    """Backfill or resync denormalized team snapshots."""
+    stats = refresh_team_snapshots(rebuild=rebuild)
+    click.echo(f"Updated {stats['modified']} of {stats['matched']} teams in {stats['elapsed_ms']}ms")
@@ -1,20 +1,81 @@
 from services.database import mongo
+from services.scoring import player_value, value_expr, derived_fields_pipeline
+from flask.cli import with_appcontext
+from bson import json_util
+import base64
+import click
+import time
 
 def calculate_player_value(points):
     """Calculate player value based on points."""
-    return round((9 * points + 100) * 1000 / 50000) * 50000
+    return player_value(points)
 
-def update_player_values():
-    """Ensure all players have a 'value' field."""
+def encode_cursor(*values):
+    """Encode the sort key of the last returned document as an opaque page cursor"""
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode a page cursor back into its sort key values.
+
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+def keyset_filter(field, direction, after):
+    """Query matching documents that sort after ``after`` under {field: direction, _id: direction}.
+
+    ``after`` is the (field value, _id) pair of the last document of the
+    previous page; pass ``field=None`` to page on _id alone. Documents
+    with the field null or missing sort lowest, as MongoDB orders them.
+    """
+    op = '$gt' if direction > 0 else '$lt'
+    if field is None:
+        return {'_id': {op: after[-1]}}
+    value, last_id = after
+    ties = {field: value, '_id': {op: last_id}}
+    if value is None:
+        # Every non-null value sorts above null
+        return {'$or': [{field: {'$ne': None}}, ties]} if direction > 0 else ties
+    if direction > 0:
+        return {'$or': [{field: {op: value}}, ties]}
+    return {'$or': [{field: {op: value}}, ties, {field: None}]}
+
+def update_player_values(recompute=False):
+    """Ensure all players have a 'value' field.
+
+    Runs as a single server-side pipeline update, so players already carrying
+    a value cost nothing. With ``recompute=True`` every derived field is
+    recalculated from the raw stats, e.g. after a formula change.
+    """
     if mongo.db is None:
         raise RuntimeError("MongoDB not initialized")
-    
-    players = mongo.db.players.find()
-    for player in players:
-        if 'value' not in player:
-            points = player.get('points', 0)
-            value = calculate_player_value(points)
-            mongo.db.players.update_one(
-                {'_id': player['_id']},
-                {'$set': {'value': value}}
-            )
\ No newline at end of file
+
+    started = time.perf_counter()
+    if recompute:
+        result = mongo.db.players.update_many({}, derived_fields_pipeline())
+    else:
+        result = mongo.db.players.update_many(
+            {'value': {'$exists': False}},
+            [{'$set': {'value': value_expr({'$ifNull': ['$points', 0]})}}]
+        )
+
+    return {
+        'matched': result.matched_count,
+        'modified': result.modified_count,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+@click.command('refresh-values')
+@click.option('--all', 'recompute', is_flag=True,
+              help='Recompute derived stats for every player, not just missing values.')
+@with_appcontext
+def refresh_values_command(recompute):
+    """Fill in or recompute player values."""
+    stats = update_player_values(recompute=recompute)
+    click.echo(f"Updated {stats['modified']} of {stats['matched']} players in {stats['elapsed_ms']}ms")
@@ -0,0 +1,115 @@
+"""Team snapshot sync against match performance ingest.
+
+The ingest tests need a scratch MongoDB (5.0+, for the time-series
+ledger) named by TEST_MONGO_URI; its database is dropped.
+"""
+from benchmarks.common import make_app
+from extensions import mongo
+from services import performances, teams
+from services.teams import TEAM_SIZE, team_entry
+from bson import ObjectId
+import os
+import pytest
+
+TEST_MONGO_URI = os.getenv("TEST_MONGO_URI")
+
+
+def _update(*fields):
+    return {'operationType': 'update', 'documentKey': {'_id': ObjectId()},
+            'updateDescription': {'updatedFields': {field: 1 for field in fields}, 'removedFields': []}}
+
+
+@pytest.fixture
+def synced(monkeypatch):
+    calls = []
+    monkeypatch.setattr(teams, 'apply_player_change', lambda player_id: calls.append(player_id) or 0)
+    return calls
+
+
+def test_snapshot_change_is_synced(synced):
+    teams._sync_team_snapshots(_update('points', 'value'))
+    assert len(synced) == 1
+
+
+def test_first_match_ingest_is_not_synced(synced):
+    teams._sync_team_snapshots(_update('Total_Runs', 'points', 'last_performance'))
+    assert synced == []
+
+
+def test_later_match_ingest_is_not_synced(synced):
+    teams._sync_team_snapshots(_update('Total_Runs', 'points', 'last_performance.at',
+                                       'last_performance.points_delta'))
+    assert synced == []
+
+
+@pytest.fixture
+def db():
+    if not TEST_MONGO_URI:
+        pytest.skip("TEST_MONGO_URI is not set")
+    app, _ = make_app(TEST_MONGO_URI)
+    with app.app_context():
+        mongo.cx.drop_database(mongo.db.name)
+        performances.ensure_collection()
+        yield mongo.db
+        mongo.cx.drop_database(mongo.db.name)
+
+
+@pytest.fixture
+def team(db):
+    """A complete team of players on 10 points each, returned as the player documents"""
+    players = [{'Name': f"Player {i}", 'University': 'U', 'Category': 'Batsman', 'points': 10.0,
+                'value': 100000, 'Total_Runs': 100, 'Balls_Faced': 100, 'Innings_Played': 5}
+               for i in range(TEAM_SIZE)]
+    db.players.insert_many(players)
+    db.users.insert_one({'username': 'u', 'team': [team_entry(player) for player in players], 'budget': 0,
+                         'team_value': 0, 'team_points': 110.0, 'total_points': 110.0, 'points_history': []})
+    return players
+
+
+def _assert_counted_once(db, players, batches):
+    player = db.players.find_one({'_id': players[0]['_id']})
+    user = db.users.find_one({'username': 'u'})
+    expected = round(player['points'] + 10.0 * (TEAM_SIZE - 1), 2)
+    assert user['team'][0]['points'] == player['points']
+    assert user['team_points'] == expected
+    assert user['total_points'] == expected
+    assert len(user['points_history']) == batches
+
+
+def _ingest(players, match_ids):
+    player_id = str(players[0]['_id'])
+    for match_id in match_ids:
+        performances.ingest_performances(match_id, [{'player_id': player_id, 'Total_Runs': 50, 'Balls_Faced': 30}])
+
+
+def test_two_batches_count_team_points_once(db, team, monkeypatch):
+    # Let the change listener run between the player write and the team write,
+    # with the fields the server reports for that write
+    apply_to_player = performances._apply_to_player
+
+    def racing(player_id, deltas, match_id, now):
+        seen = db.players.find_one({'_id': player_id}, {'last_performance': 1})
+        player = apply_to_player(player_id, deltas, match_id, now)
+        performance = ['last_performance.at', 'last_performance.points_delta'] \
+            if seen.get('last_performance') else ['last_performance']
+        teams._sync_team_snapshots(_update(*deltas, 'points', *performance) | {'documentKey': {'_id': player_id}})
+        return player
+
+    monkeypatch.setattr(performances, '_apply_to_player', racing)
+    _ingest(team, ('m1', 'm2'))
+    _assert_counted_once(db, team, 2)
+
+
+def test_stale_sync_between_player_and_team_write(db, team, monkeypatch):
+    # A queued sync for an earlier change (an admin edit, a team add) reads the
+    # already updated player and writes its points before the ingest's team write
+    apply_to_player = performances._apply_to_player
+
+    def racing(player_id, deltas, match_id, now):
+        player = apply_to_player(player_id, deltas, match_id, now)
+        teams._sync_team_snapshots(_update('points') | {'documentKey': {'_id': player_id}})
+        return player
+
+    monkeypatch.setattr(performances, '_apply_to_player', racing)
+    _ingest(team, ('m1', 'm2'))
+    _assert_counted_once(db, team, 2)
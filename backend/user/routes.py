@@ -1,14 +1,21 @@
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identity
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required, create_access_token, create_refresh_token, get_jwt_identity
 from bson import ObjectId
+from pymongo import ReturnDocument
 from datetime import timedelta
 import math
 from services.database import mongo
 from services.realtime import socketio
-from services.utils import calculate_player_value
-from extensions import bcrypt, mongo, socketio
+from services.utils import encode_cursor
+from services import catalog, leaderboard, optimizer, ratelimit, teams
+from services.passwords import hash_password, check_password, needs_rehash, rehash_in_background
+from extensions import mongo, socketio
 
 user_bp = Blueprint('user', __name__)
+user_bp.before_request(ratelimit.limit_request)
+
+TEAM_SIZE = teams.TEAM_SIZE
+MAX_PAGE_SIZE = 200
 
 # User Authentication
 @user_bp.route('/signup', methods=['POST'])
@@ -20,13 +27,15 @@ def signup():
     if mongo.db.users.find_one({"username": data['username']}):
         return jsonify({"msg": "Username already exists"}), 409
     
-    hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+    hashed_password = hash_password(data['password'])
 
     user_data = {
         "username": data['username'],
         "password": hashed_password,  # In production, use password hashing
         "budget": 9000000,
         "team": [],
+        "team_value": 0,
+        "team_points": 0,
         "total_points": 0,
         "points_history": []
     }
@@ -43,111 +52,123 @@ def login():
     if not data or 'username' not in data or 'password' not in data:
         return jsonify({"msg": "Missing username or password"}), 400
     
-    user = mongo.db.users.find_one({"username": data.get('username')})
+    user = mongo.db.users.find_one({"username": data.get('username')}, {"password": 1})
 
-    if user and bcrypt.check_password_hash(user['password'], data.get('password')):
-        access_token = create_access_token(identity=str(user['_id']))
+    if user and check_password(user['password'], data.get('password')):
+        if needs_rehash(user['password']):
+            # The work factor changed since this hash was made; upgrade it
+            # off the request path, unless the password changed meanwhile
+            rehash_in_background(data['password'], lambda hashed: mongo.db.users.update_one(
+                {"_id": user['_id'], "password": user['password']},
+                {"$set": {"password": hashed}}
+            ))
+        
+        identity = str(user['_id'])
         return jsonify({
-            "access_token": access_token,
-            "user_id": str(user['_id'])
+            "access_token": create_access_token(identity=identity),
+            "refresh_token": create_refresh_token(identity=identity),
+            "user_id": identity
         }), 200
 
     return jsonify({"msg": "Invalid credentials"}), 401
+
+@user_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh_access_token():
+    """Issue a new access token without repeating the password check"""
+    return jsonify({"access_token": create_access_token(identity=get_jwt_identity())}), 200
     
 
 # Player Management
+def catalog_response(category=None):
+    """Serve a cached catalog body, answering 304 when the client's ETag matches"""
+    body, etag = catalog.get(category)
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
 @user_bp.route('/players', methods=['GET'])
 @jwt_required()
 def get_all_players():
-    players = list(mongo.db.players.find({}, {'points': 0}))
-    return jsonify([{
-        "_id": str(player["_id"]),
-        "Name": player["Name"],
-        "University": player["University"],
-        "Category": player["Category"],
-        "value": player.get("value", 0)
-    } for player in players]), 200
+    return catalog_response()
 
 @user_bp.route('/players/<string:category>', methods=['GET'])
 @jwt_required()
 def get_players_by_category(category):
-    players = list(mongo.db.players.find(
-        {"Category": category},
-        {'points': 0}
-    ))
-    return jsonify([{
-        "_id": str(player["_id"]),
-        "Name": player["Name"],
-        "University": player["University"],
-        "value": player.get("value", 0)
-    } for player in players]), 200
+    return catalog_response(category)
 
 # Team Management
 @user_bp.route('/team', methods=['GET'])
 @jwt_required()
 def get_user_team():
     user_id = get_jwt_identity()
-    user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
+    user = mongo.db.users.find_one(
+        {"_id": ObjectId(user_id)},
+        {"team": 1, "budget": 1, "team_value": 1, "total_points": 1}
+    )
     
     if not user:
         return jsonify({"msg": "User not found"}), 404
     
-    team_details = []
-    for player in user['team']:
-        player_data = mongo.db.players.find_one(
-            {"_id": ObjectId(player['player_id'])},
-            {'points': 0}
-        )
-        if player_data:
-            team_details.append({
-                "player_id": str(player_data["_id"]),
-                "Name": player_data["Name"],
-                "University": player_data["University"],
-                "value": player_data.get("value", 0)
-            })
-    
+    # Points are only revealed once the team is complete
     return jsonify({
-        "team": team_details,
+        "team": [teams.public_entry(p) for p in user["team"]],
         "budget": user["budget"],
-        "team_size": len(team_details),
-        "total_points": user["total_points"] if len(team_details) == 11 else 0
+        "team_size": len(user["team"]),
+        "team_value": user.get("team_value", 0),
+        "total_points": user.get("total_points", 0) if len(user["team"]) == TEAM_SIZE else 0
     }), 200
 
+def _add_rejection(user_id, player_id):
+    """Explain why a conditional team add matched no user"""
+    user = mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"team": 1})
+    if not user:
+        return jsonify({"msg": "User or player not found"}), 404
+    if any(p['player_id'] == player_id for p in user['team']):
+        return jsonify({"msg": "Player already in team"}), 400
+    if len(user['team']) >= TEAM_SIZE:
+        return jsonify({"msg": "Team is already complete"}), 400
+    return jsonify({"msg": "Insufficient budget"}), 400
+
 @user_bp.route('/team/add', methods=['POST'])
 @jwt_required()
 def add_player_to_team():
     user_id = get_jwt_identity()
     data = request.get_json()
     
-    user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
-    player = mongo.db.players.find_one({"_id": ObjectId(data['player_id'])})
-    
-    if not user or not player:
+    player = mongo.db.players.find_one({"_id": ObjectId(data['player_id'])}, teams.SNAPSHOT_PROJECTION)
+    if not player:
         return jsonify({"msg": "User or player not found"}), 404
     
-    if any(p['player_id'] == data['player_id'] for p in user['team']):
-        return jsonify({"msg": "Player already in team"}), 400
-    
-    if user['budget'] < player.get('value', 0):
-        return jsonify({"msg": "Insufficient budget"}), 400
+    entry = teams.team_entry(player)
+    player_id, value = entry["player_id"], entry["value"]
     
-    # Update user team and budget
-    mongo.db.users.update_one(
-        {"_id": ObjectId(user_id)},
+    # Update user team and budget only if the player fits the budget,
+    # is not already picked and the team still has a free slot; the team
+    # totals, and total_points once the team is complete, follow in the
+    # same write
+    updated_user = mongo.db.users.find_one_and_update(
         {
-            "$push": {"team": {"player_id": str(player["_id"]), "value": player["value"]}},
-            "$inc": {"budget": -player["value"]}
-        }
+            "_id": ObjectId(user_id),
+            "budget": {"$gte": value},
+            "team.player_id": {"$ne": player_id},
+            f"team.{TEAM_SIZE - 1}": {"$exists": False}
+        },
+        [
+            {"$set": {
+                "team": {"$concatArrays": ["$team", {"$literal": [entry]}]},
+                "budget": {"$subtract": ["$budget", value]}
+            }},
+            *teams.totals_stages()
+        ],
+        projection={"total_points": 1},
+        return_document=ReturnDocument.AFTER
     )
+    if not updated_user:
+        return _add_rejection(user_id, player_id)
     
-    # Calculate new total points if team is complete
-    updated_user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
-    if len(updated_user['team']) == 11:
-        total_points = sum(calculate_player_value(p['value']) for p in updated_user['team'])
-        mongo.db.users.update_one(
-            {"_id": ObjectId(user_id)},
-            {"$set": {"total_points": total_points}}
-        )
+    if updated_user.get("total_points"):
+        leaderboard.invalidate()
     
     socketio.emit('team_update', {'user_id': user_id})
     return jsonify({"msg": "Player added to team"}), 200
@@ -156,54 +177,111 @@ def add_player_to_team():
 @jwt_required()
 def remove_player_from_team(player_id):
     user_id = get_jwt_identity()
-    user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
-    
-    if not user:
-        return jsonify({"msg": "User not found"}), 404
-    
-    player_to_remove = next((p for p in user['team'] if p['player_id'] == player_id), None)
-    if not player_to_remove:
-        return jsonify({"msg": "Player not in team"}), 404
+    in_team = {"$eq": ["$$this.player_id", {"$literal": player_id}]}
     
-    # Update user team and budget
-    mongo.db.users.update_one(
-        {"_id": ObjectId(user_id)},
-        {
-            "$pull": {"team": {"player_id": player_id}},
-            "$inc": {"budget": player_to_remove['value']}
-        }
+    # Refund the player's value, drop them from the team and recompute the
+    # team totals, all in one conditional update
+    user = mongo.db.users.find_one_and_update(
+        {"_id": ObjectId(user_id), "team.player_id": player_id},
+        [{"$set": {
+            "budget": {"$add": ["$budget", {"$sum": {"$map": {
+                "input": {"$filter": {"input": "$team", "cond": in_team}},
+                "in": "$$this.value"
+            }}}]},
+            "team": {"$filter": {"input": "$team", "cond": {"$not": [in_team]}}}
+        }}, *teams.totals_stages()],
+        projection={"total_points": 1}
     )
     
-    # Reset points if team becomes incomplete
-    if len(user['team']) == 11:
-        mongo.db.users.update_one(
-            {"_id": ObjectId(user_id)},
-            {"$set": {"total_points": 0}}
-        )
+    if not user:
+        if not mongo.db.users.count_documents({"_id": ObjectId(user_id)}, limit=1):
+            return jsonify({"msg": "User not found"}), 404
+        return jsonify({"msg": "Player not in team"}), 404
     
+    if user.get("total_points"):
+        leaderboard.invalidate()
     socketio.emit('team_update', {'user_id': user_id})
     return jsonify({"msg": "Player removed from team"}), 200
 
+@user_bp.route('/team/suggest', methods=['POST'])
+@jwt_required()
+def suggest_team():
+    """Best-scoring full team for the user's purse, keeping any locked picks.
+
+    ``locked`` defaults to the players already in the user's team. ``exact``
+    is false when the search ran out of time and a greedy lineup is returned.
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    user = mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"team": 1, "budget": 1})
+    if not user:
+        return jsonify({"msg": "User not found"}), 404
+    
+    limits = current_app.config['TEAM_CATEGORY_LIMITS']
+    pool = optimizer.get_pool(limits)
+    locked_ids = data.get('locked', [p['player_id'] for p in user['team']])
+    if not isinstance(locked_ids, list) or \
+            any(not isinstance(player_id, str) or player_id not in pool.index for player_id in locked_ids):
+        return jsonify({"msg": "Locked picks must be existing player ids"}), 400
+    
+    # Players kept from the team cost what the user paid for them, the rest
+    # their current value; the optimizer charges every locked pick at current
+    # value, so the purse is shifted by the difference for kept players
+    paid = {p['player_id']: p['value'] for p in user['team']}
+    locked_ids = set(locked_ids)
+    purse = user['budget'] + sum(paid.values()) + \
+        sum(int(pool.value[pool.index[player_id]]) - paid[player_id] for player_id in locked_ids if player_id in paid)
+    locked = [pool.index[player_id] for player_id in locked_ids]
+    try:
+        lineup, exact = optimizer.suggest_lineup(pool, locked, purse, limits, current_app.config['TEAM_UNIVERSITY_CAP'])
+    except optimizer.SearchAborted:
+        return jsonify({"msg": "Lineup search gave up before finding a team; lock more players to narrow it"}), 503
+    if lineup is None:
+        return jsonify({"msg": "No team fits the budget and team rules"}), 400
+    
+    # Player points stay hidden from users, so only the lineup and its cost are returned
+    team = []
+    for i in lineup:
+        entry = teams.public_entry(teams.team_entry(pool.players[i]))
+        if pool.ids[i] in locked_ids and pool.ids[i] in paid:
+            entry["value"] = paid[pool.ids[i]]
+        team.append({**entry, "locked": pool.ids[i] in locked_ids})
+    return jsonify({
+        "team": team,
+        "team_value": sum(p["value"] for p in team),
+        "exact": exact
+    }), 200
+
 # Leaderboard
 @user_bp.route('/leaderboard', methods=['GET'])
 @jwt_required()
 def get_leaderboard():
     current_user_id = get_jwt_identity()
-    users = list(mongo.db.users.find({}, {
-        "username": 1,
-        "total_points": 1,
-        "_id": 1
-    }))
-    
-    leaderboard = []
-    for user in users:
-        leaderboard.append({
-            "username": user["username"],
-            "points": user["total_points"],
-            "is_current_user": str(user["_id"]) == current_user_id
-        })
-    
-    # Sort by points descending
-    leaderboard.sort(key=lambda x: x["points"], reverse=True)
-    
-    return jsonify(leaderboard), 200
\ No newline at end of file
+    limit = max(1, min(request.args.get('limit', 50, type=int), MAX_PAGE_SIZE))
+    
+    try:
+        after = leaderboard.parse_cursor(request.args['cursor']) if 'cursor' in request.args else None
+    except ValueError:
+        return jsonify({"msg": "Invalid cursor"}), 400
+    
+    entries, has_more = leaderboard.get_page(limit, after)
+    
+    # The body stays a plain array; the next page's cursor goes in a header
+    # as with the admin player listing
+    response = jsonify([{
+        "username": entry["username"],
+        "points": entry["points"],
+        "is_current_user": entry["user_id"] == current_user_id
+    } for entry in entries])
+    if has_more:
+        response.headers['X-Next-Cursor'] = encode_cursor(*entries[-1]["_sort"])
+    return response, 200
+
+@user_bp.route('/leaderboard/me', methods=['GET'])
+@jwt_required()
+def get_my_rank():
+    rank = leaderboard.get_rank(ObjectId(get_jwt_identity()))
+    if not rank:
+        return jsonify({"msg": "User not found"}), 404
+    
+    return jsonify({"rank": rank[0], "points": rank[1]}), 200
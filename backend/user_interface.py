@@ -1,18 +1,82 @@
-from flask import Flask, request, jsonify
-import mysql.connector
+from flask import Flask, Response, request, jsonify, json, stream_with_context
+from contextlib import contextmanager
+from mysql.connector.constants import ClientFlag
+import mysql.connector.pooling
 import hashlib
 import os
+import threading
 
 app = Flask(__name__)
 
 # Database Connection
-def connect_db():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",  # Replace with your MySQL username
-        password="",  # Replace with your MySQL password
-        database="spirit11_db"  # Replace with your database name
-    )
+DB_CONFIG = {
+    "host": os.getenv("MYSQL_HOST", "localhost"),
+    "user": os.getenv("MYSQL_USER", "root"),  # Replace with your MySQL username
+    "password": os.getenv("MYSQL_PASSWORD", ""),  # Replace with your MySQL password
+    "database": os.getenv("MYSQL_DATABASE", "spirit11_db"),  # Replace with your database name
+    # Report matched rather than changed rows, so a conditional UPDATE that
+    # leaves a value as it was still counts as a hit
+    "client_flags": [ClientFlag.FOUND_ROWS]
+}
+# mysql-connector caps a pool at 32 connections
+POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "10"))
+# Seconds a request waits for a free connection before giving up
+POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "5"))
+# Rows pulled from the server per round trip when streaming players
+FETCH_SIZE = 500
+
+_pool = None
+_pool_lock = threading.Lock()
+# get_connection() fails at once when the pool is empty; this makes callers queue instead
+_pool_slots = threading.BoundedSemaphore(POOL_SIZE)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def get_pool():
+    """Return the shared connection pool, opening it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name="spirit11", pool_size=POOL_SIZE, pool_reset_session=True, **DB_CONFIG
+            )
+        return _pool
+
+
+@contextmanager
+def db_cursor(dictionary=False):
+    """Check out a pooled connection and yield a cursor on it.
+
+    Everything run on the cursor is one transaction: it is committed when
+    the block exits cleanly and rolled back on an exception. The connection
+    goes back to the pool either way.
+    """
+    if not _pool_slots.acquire(timeout=POOL_TIMEOUT):
+        raise PoolTimeout()
+    try:
+        connection = get_pool().get_connection()
+        try:
+            cursor = connection.cursor(dictionary=dictionary)
+            try:
+                yield cursor
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+        finally:
+            connection.close()
+    finally:
+        _pool_slots.release()
+
+
+@app.errorhandler(PoolTimeout)
+def pool_timeout(_):
+    return jsonify({"message": "Database busy, try again"}), 503
 
 # Hash password function
 def hash_password(password):
@@ -28,14 +92,8 @@ def register_user():
     
     hashed_password = hash_password(password)
 
-    connection = connect_db()
-    cursor = connection.cursor()
-    
-    cursor.execute("INSERT INTO users (username, password, email) VALUES (%s, %s, %s)", (username, hashed_password, email))
-    connection.commit()
-    
-    cursor.close()
-    connection.close()
+    with db_cursor() as cursor:
+        cursor.execute("INSERT INTO users (username, password, email) VALUES (%s, %s, %s)", (username, hashed_password, email))
     
     return jsonify({"message": "User registered successfully!"}), 201
 
@@ -48,14 +106,9 @@ def login_user():
 
     hashed_password = hash_password(password)
 
-    connection = connect_db()
-    cursor = connection.cursor()
-    
-    cursor.execute("SELECT * FROM users WHERE username = %s AND password = %s", (username, hashed_password))
-    user = cursor.fetchone()
-    
-    cursor.close()
-    connection.close()
+    with db_cursor() as cursor:
+        cursor.execute("SELECT id FROM users WHERE username = %s AND password = %s", (username, hashed_password))
+        user = cursor.fetchone()
 
     if user:
         return jsonify({"message": "Login successful!", "user_id": user[0]}), 200
@@ -65,16 +118,25 @@ def login_user():
 # Get All Players
 @app.route("/players", methods=["GET"])
 def get_players():
-    connection = connect_db()
-    cursor = connection.cursor()
-    
-    cursor.execute("SELECT * FROM players")
-    players = cursor.fetchall()
-    
-    cursor.close()
-    connection.close()
-    
-    return jsonify(players), 200
+    """Stream every player as a JSON object keyed by column name.
+
+    Rows are fetched FETCH_SIZE at a time and written out as they arrive,
+    so the full table is never held in memory.
+    """
+    def generate():
+        with db_cursor() as cursor:
+            cursor.execute("SELECT * FROM players")
+            columns = cursor.column_names
+            separator = "["
+            rows = cursor.fetchmany(FETCH_SIZE)
+            while rows:
+                for row in rows:
+                    yield separator + json.dumps(dict(zip(columns, row)))
+                    separator = ","
+                rows = cursor.fetchmany(FETCH_SIZE)
+            yield "[]" if separator == "[" else "]"
+
+    return Response(stream_with_context(generate()), status=200, mimetype="application/json")
 
 # Select Players for a Team
 @app.route("/select_player", methods=["POST"])
@@ -83,36 +145,28 @@ def select_player():
     user_id = data.get("user_id")
     player_id = data.get("player_id")
     
-    connection = connect_db()
-    cursor = connection.cursor()
-    
-    cursor.execute("SELECT budget FROM users WHERE id = %s", (user_id,))
-    user = cursor.fetchone()
-    
-    if user:
-        budget = user[0]
-        cursor.execute("SELECT value FROM players WHERE id = %s", (player_id,))
-        player = cursor.fetchone()
-        
-        if player:
-            player_value = player[0]
-            if budget >= player_value:
-                # Add player to the user's team
-                cursor.execute("INSERT INTO teams (user_id, player_id) VALUES (%s, %s)", (user_id, player_id))
-                # Deduct player's value from budget
-                cursor.execute("UPDATE users SET budget = budget - %s WHERE id = %s", (player_value, user_id))
-                connection.commit()
-                
-                cursor.close()
-                connection.close()
-                
-                return jsonify({"message": "Player selected successfully!"}), 201
-            else:
-                return jsonify({"message": "Insufficient budget!"}), 400
-        else:
-            return jsonify({"message": "Player not found!"}), 404
-    else:
+    with db_cursor() as cursor:
+        # Deduct player's value from budget only if it is covered; checking and
+        # charging in one statement means concurrent picks cannot overspend
+        cursor.execute(
+            "UPDATE users u JOIN players p ON p.id = %s SET u.budget = u.budget - p.value "
+            "WHERE u.id = %s AND u.budget >= p.value",
+            (player_id, user_id)
+        )
+        if cursor.rowcount == 1:
+            # Add player to the user's team
+            cursor.execute("INSERT INTO teams (user_id, player_id) VALUES (%s, %s)", (user_id, player_id))
+            return jsonify({"message": "Player selected successfully!"}), 201
+
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM users WHERE id = %s), EXISTS(SELECT 1 FROM players WHERE id = %s)",
+                       (user_id, player_id))
+        user_exists, player_exists = cursor.fetchone()
+
+    if not user_exists:
         return jsonify({"message": "User not found!"}), 404
+    if not player_exists:
+        return jsonify({"message": "Player not found!"}), 404
+    return jsonify({"message": "Insufficient budget!"}), 400
 
 # Run the App
 if __name__ == "__main__":